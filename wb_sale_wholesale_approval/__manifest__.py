@@ -1,7 +1,7 @@
 {
     'name': 'Aprobación de Ventas al Mayoreo',
     'license': 'LGPL-3',
-    'version': '1.0.0',
+    'version': '1.0.1',
     'summary': 'Módulo para gestionar la aprobación financiera de ventas al mayoreo.',
     'description': """
         Este módulo extiende el modelo de ventas de Odoo para permitir una gestión
@@ -21,7 +21,15 @@
         'views/sale_order_views.xml',
         'views/res_partner_views.xml',
         'views/sale_order_credit_views.xml',
+        'views/res_config_settings_views.xml',
+        'views/wholesale_finance_transition_views.xml',
+        'views/wholesale_perf_sample_views.xml',
+        'views/wholesale_job_views.xml',
+        'report/wholesale_finance_pipeline_report_views.xml',
+        'wizard/sale_order_finance_approval_wizard_views.xml',
+        'wizard/wholesale_bank_statement_import_views.xml',
         'data/ir_cron.xml',
+        'data/wholesale_data.xml',
     ],
     'installable': True,
     'application': False,
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from odoo import http, _
+from odoo.exceptions import AccessError
+from odoo.http import request
+
+
+class WholesaleIngestController(http.Controller):
+    """Ingesta de órdenes al mayoreo por lotes para el portal B2B y los conectores."""
+
+    @http.route('/wb_sale_wholesale_approval/orders/batch', type='json', auth='user', methods=['POST'])
+    def ingest_orders(self, orders, confirm=False):
+        """Crea un lote de órdenes al mayoreo; ver ``sale.order._wholesale_ingest_batch``.
+
+        Cuerpo JSON-RPC: ``{"params": {"orders": [...], "confirm": true}}``.
+        """
+        if not request.env.user.has_group(
+                'wb_sale_wholesale_approval.group_sales_wholesale_user'):
+            raise AccessError(_('Solo el grupo Ventas mayoreo puede ingresar órdenes al mayoreo.'))
+        return request.env['sale.order']._wholesale_ingest_batch(orders, confirm=bool(confirm))
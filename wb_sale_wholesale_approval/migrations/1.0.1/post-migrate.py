@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from odoo import SUPERUSER_ID, api
+
+from odoo.addons.wb_sale_wholesale_approval.models.sale_order import (
+    AUTO_CANCEL_INTERVAL_MINUTES, AUTO_CANCEL_INTERVAL_PARAM,
+)
+
+
+def migrate(cr, version):
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    _sync_auto_cancel_interval(env)
+    # Las cargas iniciales de wholesale_data.xml están en un bloque ``noupdate`` y solo
+    # corren al instalar: en bases existentes el crédito comprometido y la carga de
+    # actividades por usuario se calculan aquí
+    env['res.partner']._wholesale_recompute_credit_exposure()
+    env['res.users']._wholesale_recompute_activity_load()
+
+
+def _sync_auto_cancel_interval(env):
+    """El cron de cancelación está en un bloque ``noupdate``: su frecuencia
+    (antes diaria) se sincroniza aquí con el parámetro configurado."""
+    cron = env.ref('wb_sale_wholesale_approval.ir_cron_auto_cancel_old_orders', raise_if_not_found=False)
+    if not cron:
+        return
+    minutes = env['ir.config_parameter'].get_param(AUTO_CANCEL_INTERVAL_PARAM)
+    try:
+        minutes = max(int(minutes), 1)
+    except (TypeError, ValueError):
+        minutes = AUTO_CANCEL_INTERVAL_MINUTES
+    cron.write({'interval_type': 'minutes', 'interval_number': minutes})
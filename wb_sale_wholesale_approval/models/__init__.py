@@ -1 +1 @@
-from . import sale_order, res_partner, sale_order_credit
\ No newline at end of file
+from . import wholesale_perf_sample, wholesale_job, sale_order, res_partner, sale_order_credit, wholesale_payment_reminder, wholesale_registry, res_company, res_config_settings, res_users, wholesale_activity_load, mail_activity, mail_message, wholesale_finance_transition
\ No newline at end of file
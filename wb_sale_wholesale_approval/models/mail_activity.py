@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+from collections import Counter
+
+from odoo import models, fields, api
+from odoo.tools.sql import column_exists, create_index
+
+# Resumen con el que se creaban las actividades antes de existir data_wholesale_stage
+WHOLESALE_STAGE_LEGACY_SUMMARIES = {
+    'payment_pending': 'Pendiente de comprobante de pago',
+    'finance_review': 'Revisión de aprobación financiera',
+    'carrier_selection': 'Selección de carrier y generación de guía',
+}
+
+
+class MailActivity(models.Model):
+    _inherit = 'mail.activity'
+
+    # Etapa del flujo de mayoreo a la que pertenece la actividad; las búsquedas
+    # se hacen por esta clave y no por el texto (traducible) del resumen
+    data_wholesale_stage = fields.Selection([
+        ('payment_pending', 'Pendiente de comprobante de pago'),
+        ('finance_review', 'Revisión de aprobación financiera'),
+        ('carrier_selection', 'Selección de carrier y generación de guía'),
+    ], string='Etapa de mayoreo', index='btree_not_null', readonly=True, copy=False)
+
+    def _auto_init(self):
+        new_column = not column_exists(self.env.cr, 'mail_activity', 'data_wholesale_stage')
+        res = super()._auto_init()
+        if new_column:
+            # Clasificar las actividades existentes según su resumen
+            for stage, summary in WHOLESALE_STAGE_LEGACY_SUMMARIES.items():
+                self.env.cr.execute("""
+                    UPDATE mail_activity
+                       SET data_wholesale_stage = %s
+                     WHERE res_model = 'sale.order'
+                       AND summary = %s
+                """, [stage, summary])
+        return res
+
+    def init(self):
+        super().init()
+        # Búsqueda de actividades de mayoreo por documento y etapa (cierre de actividades y aviso de pago)
+        create_index(
+            self.env.cr, 'mail_activity_wholesale_stage_idx', self._table,
+            ['res_model_id', 'res_id', 'data_wholesale_stage'],
+            where="data_wholesale_stage IS NOT NULL",
+        )
+
+    def _wholesale_load_by_user(self):
+        return Counter(
+            activity.user_id.id
+            for activity in self
+            if activity.res_model == 'sale.order' and activity.user_id
+        )
+
+    # Mantener la carga de actividades por usuario (bitácora wholesale.activity.load)
+    @api.model_create_multi
+    def create(self, vals_list):
+        activities = super().create(vals_list)
+        self.env['res.users']._wholesale_update_activity_load(activities._wholesale_load_by_user())
+        return activities
+
+    def write(self, vals):
+        if 'user_id' not in vals and 'res_model_id' not in vals:
+            return super().write(vals)
+        before = self._wholesale_load_by_user()
+        res = super().write(vals)
+        deltas = self._wholesale_load_by_user()
+        deltas.subtract(before)
+        self.env['res.users']._wholesale_update_activity_load(deltas)
+        return res
+
+    def unlink(self):
+        deltas = Counter({user_id: -count for user_id, count in self._wholesale_load_by_user().items()})
+        res = super().unlink()
+        self.env['res.users']._wholesale_update_activity_load(deltas)
+        return res
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields
+from odoo.tools.sql import create_index
+
+
+class MailMessage(models.Model):
+    _inherit = 'mail.message'
+
+    # Mensajes generados por el flujo de mayoreo (avisos, cancelaciones, actividades
+    # hechas); el cron de depuración los elimina de las órdenes terminadas
+    data_wholesale_automated = fields.Boolean(string='Automático de mayoreo', readonly=True, copy=False)
+
+    def init(self):
+        super().init()
+        create_index(
+            self.env.cr, 'mail_message_wholesale_automated_idx', self._table,
+            ['model', 'res_id'], where='data_wholesale_automated',
+        )
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields
+
+
+class ResCompany(models.Model):
+    _inherit = 'res.company'
+
+    data_wholesale_team_id = fields.Many2one(
+        'crm.team',
+        string='Equipo de ventas al mayoreo',
+        help='Equipo que se asigna automáticamente a las órdenes de venta al mayoreo.'
+    )
+    data_wholesale_warehouse_id = fields.Many2one(
+        'stock.warehouse',
+        string='Almacén de ventas al mayoreo',
+        help='Almacén que se propone en las órdenes de venta al mayoreo.'
+    )
+
+    def write(self, vals):
+        if 'data_wholesale_team_id' in vals or 'data_wholesale_warehouse_id' in vals:
+            self.env['wholesale.registry'].clear_caches()
+        return super().write(vals)
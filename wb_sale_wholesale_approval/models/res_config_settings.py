@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields
+
+from .sale_order import (
+    AUTO_CANCEL_INTERVAL_MINUTES, AUTO_CANCEL_INTERVAL_PARAM,
+    AUTO_CANCEL_THRESHOLD_HOURS, AUTO_CANCEL_THRESHOLD_PARAM,
+    CLEANUP_RETENTION_DAYS, CLEANUP_RETENTION_PARAM,
+    NOTIFICATION_MODE_PARAM, NOTIFICATION_MODES,
+    PAYMENT_REMINDER_MODE_PARAM, PAYMENT_REMINDER_MODES,
+)
+
+
+class ResConfigSettings(models.TransientModel):
+    _inherit = 'res.config.settings'
+
+    data_wholesale_team_id = fields.Many2one(
+        related='company_id.data_wholesale_team_id',
+        readonly=False
+    )
+    data_wholesale_warehouse_id = fields.Many2one(
+        related='company_id.data_wholesale_warehouse_id',
+        readonly=False
+    )
+    data_wholesale_perf_sampling = fields.Boolean(
+        string='Muestreo de rendimiento de mayoreo',
+        config_parameter='wb_sale_wholesale_approval.perf_sampling'
+    )
+    data_wholesale_perf_profile_next_run = fields.Boolean(
+        string='Perfilar la siguiente ejecución',
+        config_parameter='wb_sale_wholesale_approval.perf_profile_next_run'
+    )
+    data_wholesale_auto_cancel_threshold_hours = fields.Integer(
+        string='Horas para cancelación automática',
+        default=AUTO_CANCEL_THRESHOLD_HOURS,
+        config_parameter=AUTO_CANCEL_THRESHOLD_PARAM
+    )
+    data_wholesale_auto_cancel_interval_minutes = fields.Integer(
+        string='Frecuencia de cancelación automática (minutos)',
+        default=AUTO_CANCEL_INTERVAL_MINUTES,
+        config_parameter=AUTO_CANCEL_INTERVAL_PARAM
+    )
+    data_wholesale_notification_mode = fields.Selection(
+        NOTIFICATION_MODES,
+        string='Notificación a grupos de mayoreo',
+        default='followers',
+        config_parameter=NOTIFICATION_MODE_PARAM,
+        help='Con canal compartido los grupos de Ventas mayoreo, Finanzas y Comercial reciben en el canal '
+             '"Ventas al mayoreo" los cambios de estado y los avisos automáticos (rechazos, cancelaciones '
+             'automáticas y avisos de pago vencido) en lugar de seguir cada orden.'
+    )
+    data_wholesale_payment_reminder_mode = fields.Selection(
+        PAYMENT_REMINDER_MODES,
+        string='Avisos de pago vencido',
+        default='per_order',
+        config_parameter=PAYMENT_REMINDER_MODE_PARAM,
+        help='En modo resumen cada vendedor recibe un solo aviso con todas sus órdenes vencidas, '
+             'sin publicar en el chatter de cada orden.'
+    )
+    data_wholesale_cleanup_retention_days = fields.Integer(
+        string='Días de retención del historial',
+        default=CLEANUP_RETENTION_DAYS,
+        config_parameter=CLEANUP_RETENTION_PARAM,
+        help='Pasados estos días desde su último cambio de estado, las órdenes cobradas, rechazadas '
+             'o canceladas pierden sus actividades y mensajes automáticos; queda un resumen en la orden.'
+    )
+
+    def set_values(self):
+        super().set_values()
+        # La frecuencia del cron sigue al parámetro configurado
+        cron = self.env.ref('wb_sale_wholesale_approval.ir_cron_auto_cancel_old_orders', raise_if_not_found=False)
+        minutes = max(self.data_wholesale_auto_cancel_interval_minutes, 1)
+        if cron and (cron.interval_type != 'minutes' or cron.interval_number != minutes):
+            cron.sudo().write({'interval_type': 'minutes', 'interval_number': minutes})
@@ -1,5 +1,23 @@
 # -*- coding: utf-8 -*-
+import threading
+import time
+from collections import OrderedDict
+
 from odoo import models, fields, api
+from odoo.exceptions import ValidationError
+
+from .sale_order_credit import CREDIT_EXPOSURE_STATUSES
+
+# Caché por proceso del crédito disponible: {(base de datos, partner_id): (vence, valores)}.
+# Se invalida al cambiar el crédito comprometido o el límite; el TTL cubre los cambios
+# hechos en otros procesos del servidor. Las entradas se guardan en orden de
+# vencimiento: al escribir se descartan las vencidas del frente y, si se rebasa
+# CREDIT_CACHE_SIZE, las más antiguas.
+CREDIT_CACHE_TTL = 30  # segundos
+CREDIT_CACHE_SIZE = 10000
+CREDIT_CACHE_FIELDS = {'data_credit_approved', 'data_credit_limit_raw', 'data_credit_currency_id'}
+_credit_cache = OrderedDict()
+_credit_cache_lock = threading.Lock()
 
 class ResPartner(models.Model):
     _inherit = 'res.partner'
@@ -30,6 +48,22 @@ class ResPartner(models.Model):
         default=0.0,
     )
 
+    # Crédito comprometido en órdenes al mayoreo abiertas; se mantiene de forma incremental
+    # desde sale.order (ver _wholesale_sync_credit_exposure)
+    data_credit_exposure = fields.Monetary(
+        string='Crédito comprometido',
+        currency_field='data_credit_currency_id',
+        readonly=True,
+        copy=False,
+        default=0.0,
+    )
+
+    data_credit_available = fields.Monetary(
+        string='Crédito disponible',
+        currency_field='data_credit_currency_id',
+        compute='_compute_data_credit_available',
+    )
+
     # Campo funcional para controlar si el usuario puede editar el límite de crédito
     can_edit_credit_limit = fields.Boolean(
         string='Puede editar límite de crédito',
@@ -39,11 +73,10 @@ class ResPartner(models.Model):
 
     @api.depends('data_credit_approved')
     def _compute_can_edit_credit_limit(self):
+        # El grupo se evalúa una sola vez por lote, no por cada contacto
+        is_finance_user = self.env.user.has_group('wb_sale_wholesale_approval.group_finance_user')
         for partner in self:
-            partner.can_edit_credit_limit = (
-                    partner.data_credit_approved
-                    and self.env.user.has_group('wb_sale_wholesale_approval.group_finance_user')
-            )
+            partner.can_edit_credit_limit = partner.data_credit_approved and is_finance_user
 
     @api.depends('data_credit_approved', 'data_credit_limit_raw')
     def _compute_data_credit_limit(self):
@@ -52,3 +85,188 @@ class ResPartner(models.Model):
                 partner.data_credit_limit = partner.data_credit_limit_raw
             else:
                 partner.data_credit_limit = 0.0
+
+    @api.depends('data_credit_limit', 'data_credit_exposure')
+    def _compute_data_credit_available(self):
+        for partner in self:
+            partner.data_credit_available = partner.data_credit_limit - partner.data_credit_exposure
+
+    def write(self, vals):
+        if 'data_credit_currency_id' in vals:
+            # El crédito comprometido está en la moneda anterior: se vuelve a contabilizar
+            changed = self.filtered(lambda p: p.data_credit_currency_id.id != vals['data_credit_currency_id'])
+            res = super().write(vals)
+            changed._wholesale_reset_credit_exposure()
+        else:
+            res = super().write(vals)
+        if CREDIT_CACHE_FIELDS.intersection(vals):
+            self._wholesale_invalidate_available_credit(self.ids)
+        return res
+
+    # ------------------------- Servicio de crédito disponible ---------------------------
+    @api.model
+    def wholesale_available_credit(self, partner_ids):
+        """Crédito de los clientes para la captura de órdenes (método RPC).
+
+        Devuelve ``{partner_id: {'limit', 'exposure', 'available', 'currency_id'}}``,
+        con los montos en la moneda del límite de crédito de cada cliente.
+        """
+        partners = self.browse(partner_ids)
+        partners.check_access_rights('read')
+        partners.check_access_rule('read')
+        return partners._wholesale_available_credit()
+
+    def _wholesale_available_credit(self):
+        """Igual que ``wholesale_available_credit``, leyendo de la caché por proceso
+        y consultando solo los clientes vencidos o ausentes."""
+        dbname = self.env.cr.dbname
+        now = time.monotonic()
+        result = {}
+        missing = []
+        with _credit_cache_lock:
+            for partner_id in self.ids:
+                entry = _credit_cache.get((dbname, partner_id))
+                if entry and entry[0] > now:
+                    result[partner_id] = entry[1]
+                else:
+                    missing.append(partner_id)
+        if missing:
+            fetched = {}
+            for partner in self.browse(missing).sudo():
+                fetched[partner.id] = {
+                    'limit': partner.data_credit_limit,
+                    'exposure': partner.data_credit_exposure,
+                    'available': partner.data_credit_available,
+                    'currency_id': partner.data_credit_currency_id.id,
+                }
+            with _credit_cache_lock:
+                for partner_id, values in fetched.items():
+                    key = (dbname, partner_id)
+                    _credit_cache[key] = (now + CREDIT_CACHE_TTL, values)
+                    _credit_cache.move_to_end(key)
+                # El TTL es fijo: las entradas vencidas están todas al frente
+                while _credit_cache and (len(_credit_cache) > CREDIT_CACHE_SIZE
+                                         or next(iter(_credit_cache.values()))[0] <= now):
+                    _credit_cache.popitem(last=False)
+            result.update(fetched)
+        return result
+
+    @api.model
+    def _wholesale_invalidate_available_credit(self, partner_ids):
+        """Quita los clientes de la caché ahora y de nuevo al confirmar o revertir la
+        transacción, para no servir valores leídos dentro de una transacción revertida."""
+        dbname = self.env.cr.dbname
+        keys = [(dbname, partner_id) for partner_id in partner_ids]
+
+        def invalidate():
+            with _credit_cache_lock:
+                for key in keys:
+                    _credit_cache.pop(key, None)
+
+        invalidate()
+        self.env.cr.postcommit.add(invalidate)
+        self.env.cr.postrollback.add(invalidate)
+
+    @api.model
+    def _wholesale_apply_credit_exposure(self, deltas):
+        """Suma ``{partner_id: delta}`` al crédito comprometido de los clientes.
+
+        Las filas se bloquean en orden de id (``FOR UPDATE``) para que las
+        confirmaciones concurrentes de un mismo cliente se serialicen, y los
+        incrementos se validan contra el límite con los valores ya bloqueados.
+        """
+        partner_ids = sorted(partner_id for partner_id, delta in deltas.items() if partner_id and delta)
+        if not partner_ids:
+            return
+        self.flush_model(['data_credit_exposure', 'data_credit_approved', 'data_credit_limit_raw'])
+        self.env.cr.execute("""
+            SELECT id, COALESCE(data_credit_exposure, 0.0),
+                   CASE WHEN data_credit_approved THEN COALESCE(data_credit_limit_raw, 0.0) ELSE 0.0 END
+              FROM res_partner
+             WHERE id IN %s
+          ORDER BY id
+               FOR UPDATE
+        """, [tuple(partner_ids)])
+        for partner_id, exposure, limit in self.env.cr.fetchall():
+            delta = deltas[partner_id]
+            if delta > 0 and exposure + delta > limit + 1e-6:
+                partner = self.browse(partner_id)
+                raise ValidationError(
+                    f"El crédito comprometido de {partner.display_name} ({exposure + delta}) "
+                    f"superaría su límite de crédito ({limit})."
+                )
+
+        self.env.cr.execute("""
+            UPDATE res_partner p
+               SET data_credit_exposure = COALESCE(p.data_credit_exposure, 0.0) + d.delta
+              FROM unnest(%s::int[], %s::numeric[]) AS d(partner_id, delta)
+             WHERE p.id = d.partner_id
+        """, [partner_ids, [deltas[partner_id] for partner_id in partner_ids]])
+        self.invalidate_model(['data_credit_exposure', 'data_credit_available'])
+        self._wholesale_invalidate_available_credit(partner_ids)
+
+    def _wholesale_reset_credit_exposure(self):
+        """Vuelve a contabilizar, en la moneda de crédito actual, el crédito comprometido
+        de las órdenes abiertas de estos clientes."""
+        if not self:
+            return
+        self.env['sale.order'].flush_model(['data_credit_exposure_amount'])
+        self.env.cr.execute("""
+            UPDATE sale_order SET data_credit_exposure_amount = 0.0
+             WHERE partner_id IN %s AND data_credit_exposure_amount <> 0.0
+         RETURNING id
+        """, [tuple(self.ids)])
+        order_ids = [row[0] for row in self.env.cr.fetchall()]
+        self.env.cr.execute("UPDATE res_partner SET data_credit_exposure = 0.0 WHERE id IN %s", [tuple(self.ids)])
+        self.env['sale.order'].invalidate_model(['data_credit_exposure_amount'])
+        self.invalidate_model(['data_credit_exposure', 'data_credit_available'])
+        self.env['sale.order'].browse(order_ids)._wholesale_sync_credit_exposure()
+
+    @api.model
+    def _wholesale_recompute_credit_exposure(self):
+        """Recalcula desde cero el crédito comprometido de órdenes y clientes.
+        Solo se usa al instalar el módulo o para corregir desviaciones."""
+        self.env['sale.order'].flush_model()
+        self.env.cr.execute("""
+            UPDATE sale_order
+               SET data_credit_exposure_amount = CASE
+                   WHEN data_is_wholesale_sale AND data_is_credit_sale
+                        AND state IN ('sale', 'done')
+                        AND data_finance_approval_status IN %s
+                   THEN COALESCE(data_total_order_amount, 0.0) - COALESCE(data_debit_amount, 0.0)
+                   ELSE 0.0
+               END
+             WHERE data_is_credit_sale OR data_credit_exposure_amount <> 0.0
+        """, [CREDIT_EXPOSURE_STATUSES])
+        # Las órdenes en otra moneda que la del crédito del cliente se convierten con el ORM
+        self.env.cr.execute("""
+            SELECT so.id
+              FROM sale_order so
+              JOIN res_partner rp ON rp.id = so.partner_id
+             WHERE so.data_credit_exposure_amount <> 0.0
+               AND so.currency_id <> rp.data_credit_currency_id
+        """)
+        foreign_orders = self.env['sale.order'].browse([row[0] for row in self.env.cr.fetchall()])
+        if foreign_orders:
+            self.env.cr.execute("""
+                UPDATE sale_order so
+                   SET data_credit_exposure_amount = t.amount
+                  FROM unnest(%s::int[], %s::numeric[]) AS t(order_id, amount)
+                 WHERE so.id = t.order_id
+            """, [foreign_orders.ids, [order._wholesale_credit_exposure_target() for order in foreign_orders]])
+        self.env.cr.execute("UPDATE res_partner SET data_credit_exposure = 0.0 WHERE data_credit_exposure <> 0.0")
+        self.env.cr.execute("""
+            UPDATE res_partner p
+               SET data_credit_exposure = s.exposure
+              FROM (
+                    SELECT partner_id, SUM(data_credit_exposure_amount) AS exposure
+                      FROM sale_order
+                     WHERE data_credit_exposure_amount <> 0.0
+                  GROUP BY partner_id
+              ) s
+             WHERE p.id = s.partner_id
+        """)
+        self.env['sale.order'].invalidate_model(['data_credit_exposure_amount'])
+        self.invalidate_model(['data_credit_exposure', 'data_credit_available'])
+        with _credit_cache_lock:
+            _credit_cache.clear()
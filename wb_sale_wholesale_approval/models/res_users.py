@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+import heapq
+
+from odoo import models, fields, api
+
+
+class ResUsers(models.Model):
+    _inherit = 'res.users'
+
+    # Actividades abiertas en órdenes de venta asignadas al usuario.
+    # Se lleva en la bitácora wholesale.activity.load (ver mail_activity.py).
+    data_wholesale_activity_load = fields.Integer(
+        string='Actividades abiertas en ventas',
+        compute='_compute_data_wholesale_activity_load',
+    )
+
+    def _compute_data_wholesale_activity_load(self):
+        loads = self.env['wholesale.activity.load']._get_loads(self.ids)
+        for user in self:
+            user.data_wholesale_activity_load = loads.get(user.id, 0)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self.env['wholesale.registry'].clear_caches()
+        return super().create(vals_list)
+
+    def write(self, vals):
+        if 'groups_id' in vals or 'active' in vals:
+            self.env['wholesale.registry'].clear_caches()
+        return super().write(vals)
+
+    def unlink(self):
+        self.env['wholesale.registry'].clear_caches()
+        return super().unlink()
+
+    @api.model
+    def _wholesale_pick_assignees(self, group_xmlid, count):
+        """Reparte ``count`` asignaciones entre los miembros del grupo según su carga.
+
+        Devuelve una lista de ``count`` ids de usuario: cada asignación va al
+        miembro con menos actividades abiertas, contando las ya repartidas en
+        esta misma llamada. Si el grupo no tiene miembros se usa el usuario actual.
+        """
+        user_ids = self.env['wholesale.registry']._get_group_user_ids(group_xmlid)
+        # Los ids en caché pueden ser de usuarios ya borrados o archivados; solo cuentan los vigentes
+        heap = [(load, user_id) for user_id, load in self.env['wholesale.activity.load']._get_loads(user_ids).items()]
+        if not heap:
+            return [self.env.uid] * count
+        heapq.heapify(heap)
+
+        assignees = []
+        for _i in range(count):
+            load, user_id = heapq.heappop(heap)
+            assignees.append(user_id)
+            heapq.heappush(heap, (load + 1, user_id))
+        return assignees
+
+    @api.model
+    def _wholesale_update_activity_load(self, deltas):
+        """Registra los cambios ``{user_id: delta}`` de carga, sin actualizar ``res_users``."""
+        self.env['wholesale.activity.load']._add(deltas)
+
+    @api.model
+    def _wholesale_recompute_activity_load(self):
+        """Recalcula la carga de todos los usuarios a partir de mail_activity.
+        Solo se usa al instalar o actualizar el módulo, o para corregir desviaciones."""
+        self.env['wholesale.activity.load']._recompute()
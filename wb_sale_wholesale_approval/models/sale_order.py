@@ -1,10 +1,83 @@
 # -*- coding: utf-8 -*-
+from markupsafe import Markup
+
 from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+from odoo.tools import format_amount
+from odoo.tools.sql import column_exists, create_column, create_index
+
+from .wholesale_perf_sample import records_in_self, wholesale_profiled
+from collections import Counter
 from datetime import datetime, timedelta
 import logging
+import time
 
 _logger = logging.getLogger(__name__)
 
+# Parámetros del cron de cancelación automática
+AUTO_CANCEL_BATCH_SIZE = 200
+AUTO_CANCEL_TIME_BUDGET = 240  # segundos por ejecución
+AUTO_CANCEL_WATERMARK_PARAM = 'wb_sale_wholesale_approval.auto_cancel_watermark'
+AUTO_CANCEL_THRESHOLD_PARAM = 'wb_sale_wholesale_approval.auto_cancel_threshold_hours'
+AUTO_CANCEL_THRESHOLD_HOURS = 144
+AUTO_CANCEL_INTERVAL_PARAM = 'wb_sale_wholesale_approval.auto_cancel_interval_minutes'
+AUTO_CANCEL_INTERVAL_MINUTES = 60
+
+# Días mínimos entre dos avisos de pago a la misma orden
+PAYMENT_REMINDER_INTERVAL_DAYS = 1
+
+# Avisos de pago: un comentario por orden o un resumen por vendedor
+PAYMENT_REMINDER_MODE_PARAM = 'wb_sale_wholesale_approval.payment_reminder_mode'
+PAYMENT_REMINDER_MODES = [
+    ('per_order', 'Un aviso en cada orden'),
+    ('digest', 'Resumen por vendedor'),
+]
+
+# Estados del flujo de aprobación financiera
+FINANCE_APPROVAL_STATUSES = [
+    ('pending', 'Pendiente de comprobante'),
+    ('validation', 'En validación'),
+    ('collected', 'Pago cobrado'),
+    ('rejected', 'Pago rechazado'),
+]
+
+# Grupos cuyos usuarios siguen las órdenes de venta al mayoreo
+WHOLESALE_FOLLOWER_GROUPS = (
+    'wb_sale_wholesale_approval.group_sales_wholesale_user',
+    'wb_sale_wholesale_approval.group_finance_user',
+    'wb_sale_wholesale_approval.group_sales_commercial_user',
+)
+
+# Parámetros del cron de depuración de órdenes terminadas
+CLEANUP_BATCH_SIZE = 200
+CLEANUP_TIME_BUDGET = 240  # segundos por ejecución
+CLEANUP_RETENTION_PARAM = 'wb_sale_wholesale_approval.cleanup_retention_days'
+CLEANUP_RETENTION_DAYS = 180
+
+# Máximo de órdenes por lote de ingesta
+INGEST_MAX_BATCH_SIZE = 5000
+# Tipo esperado de cada campo de la ingesta: 'id' (entero), 'text', 'number' o 'list'
+INGEST_ORDER_TYPES = {
+    'partner_id': 'id',
+    'partner_ref': 'text',
+    'client_order_ref': 'text',
+    'credit_amount': 'number',
+    'lines': 'list',
+}
+INGEST_LINE_TYPES = {
+    'product_id': 'id',
+    'default_code': 'text',
+    'quantity': 'number',
+    'price_unit': 'number',
+}
+
+# Modo de notificación a los grupos de mayoreo: seguidores por orden o un canal compartido
+NOTIFICATION_MODE_PARAM = 'wb_sale_wholesale_approval.notification_mode'
+NOTIFICATION_MODES = [
+    ('followers', 'Seguidores en cada orden'),
+    ('channel', 'Canal compartido'),
+]
+
 
 class SaleOrder(models.Model):
     _inherit = 'sale.order'
@@ -13,7 +86,8 @@ class SaleOrder(models.Model):
 
     data_wholesale_status_display = fields.Char(
         string='Venta al Mayoreo',
-        compute='_compute_wholesale_status_display',)
+        compute='_compute_wholesale_status_display',
+        store=True,)
 
     @api.depends('data_is_wholesale_sale')
     def _compute_wholesale_status_display(self):
@@ -23,12 +97,19 @@ class SaleOrder(models.Model):
             else:
                 order.data_wholesale_status_display = False
 
-    data_finance_approval_status = fields.Selection([
-        ('pending', 'Pendiente de comprobante'),
-        ('validation', 'En validación'),
-        ('collected', 'Pago cobrado'),
-        ('rejected', 'Pago rechazado'),
-    ], string='Estado Financiero', tracking=True, readonly=True, default=False)
+    data_finance_approval_status = fields.Selection(
+        FINANCE_APPROVAL_STATUSES, string='Estado Financiero', tracking=True, readonly=True, default=False)
+
+    # Depuración de órdenes terminadas (ver _cron_cleanup_finished_orders)
+    data_wholesale_archived = fields.Boolean(string='Historial depurado', readonly=True, copy=False)
+    data_wholesale_archive_summary = fields.Char(string='Resumen del historial', readonly=True, copy=False)
+
+    # Inicio del estado financiero actual (para la duración en wholesale.finance.transition)
+    data_finance_status_date = fields.Datetime(
+        string='Fecha del estado financiero',
+        readonly=True,
+        copy=False
+    )
 
     data_confirmation_date = fields.Datetime(
         string='Fecha de Confirmación SO',
@@ -36,226 +117,352 @@ class SaleOrder(models.Model):
         tracking=True
     )
 
+    def _auto_init(self):
+        # Crear y llenar por SQL la columna calculada almacenada (evita recalcular cada orden con el ORM)
+        if not column_exists(self.env.cr, 'sale_order', 'data_wholesale_status_display'):
+            create_column(self.env.cr, 'sale_order', 'data_wholesale_status_display', 'varchar')
+            if column_exists(self.env.cr, 'sale_order', 'data_is_wholesale_sale'):
+                self.env.cr.execute(
+                    "UPDATE sale_order SET data_wholesale_status_display = 'VENTA AL MAYOREO' WHERE data_is_wholesale_sale"
+                )
+        if not column_exists(self.env.cr, 'sale_order', 'data_finance_status_date'):
+            create_column(self.env.cr, 'sale_order', 'data_finance_status_date', 'timestamp')
+            if column_exists(self.env.cr, 'sale_order', 'data_finance_approval_status'):
+                # Mejor aproximación disponible para las órdenes existentes
+                self.env.cr.execute("""
+                    UPDATE sale_order
+                       SET data_finance_status_date = data_confirmation_date
+                     WHERE data_finance_approval_status IS NOT NULL
+                """)
+        return super()._auto_init()
+
+    def init(self):
+        super().init()
+        # Índices parciales para los dominios de los crons y las vistas de mayoreo
+        # (fecha, id) sirve además como orden de paginación del cron de cancelación
+        create_index(
+            self.env.cr, 'sale_order_wholesale_pending_confirmation_id_idx', self._table,
+            ['data_confirmation_date', 'id'],
+            where="data_is_wholesale_sale AND data_finance_approval_status = 'pending'",
+        )
+        create_index(
+            self.env.cr, 'sale_order_wholesale_finance_status_idx', self._table,
+            ['data_finance_approval_status', 'data_confirmation_date'],
+            where="data_is_wholesale_sale",
+        )
+
     # --------------------------------------------------------------------------------
     # Métodos para los botones de cambio de estado
+    @wholesale_profiled(records_in_self)
     def action_set_to_receipt_received(self):
-        self.ensure_one()
+        self._wholesale_set_to_validation()
+
+    @wholesale_profiled(records_in_self)
+    def action_set_to_collected(self):
+        self._wholesale_set_to_collected()
+
+    @wholesale_profiled(records_in_self)
+    def action_set_to_rejected(self):
+        self._wholesale_set_to_rejected()
+
+    # --------------------------------------------------------------------------------
+    # Transiciones del estado financiero (soportan varias órdenes a la vez).
+    # Cada una devuelve las órdenes omitidas por no estar en el estado de origen válido.
+    def _wholesale_set_to_validation(self):
         # Solo se puede pasar a 'comprobante recibido' desde 'pendiente'
-        if self.data_finance_approval_status in ['pending']:
-
-            # -------- Buscar y marcar la actividad de comprobante de pago como hecha -----------------------------
-            # Referencia al tipo de actividad
-            activity_type_id = self.env.ref('mail.mail_activity_data_todo').id
-            # Referencia al modelo de la orden de venta
-            sale_order_model_id = self.env.ref('sale.model_sale_order').id
-
-            # Buscar la actividad con el dominio
-            activities_to_done = self.env['mail.activity'].search([
-                ('res_id', '=', self.id),
-                ('res_model_id', '=', sale_order_model_id),
-                ('activity_type_id', '=', activity_type_id),
-                ('summary', '=', 'Pendiente de comprobante de pago')
-            ])
+        orders = self.filtered(lambda o: o.data_finance_approval_status == 'pending')
+        if not orders:
+            return self
 
-            # Marcar las actividades encontradas como hechas
-            if activities_to_done:
-                activities_to_done.action_done()
-
-            # ----------------------------------------------------------------------
-            # Creacion de actividad para verificacion del pago
-            finance_group = self.env.ref('wb_sale_wholesale_approval.group_finance_user')
-            finance_user = self.env['res.users'].search([('groups_id', 'in', finance_group.ids)], limit=1)
-
-            self.data_confirmation_date = datetime.now()
-            # Se agenda la taarea para el mismo dia, colocandola como actividad para el mismo dia
-            date_deadline = datetime.now()
-
-            if finance_user:
-                self.activity_schedule(
-                    'mail.mail_activity_data_todo',
-                    summary=_('Revisión de aprobación financiera'),
-                    note=_('Revisar comrpobante de pago y actualizar el estado financiero de esta orden de venta al mayoreo.'),
-                    user_id=finance_user.id,
-                    date_deadline=date_deadline,
-                )
-            else:
-                self.activity_schedule(
-                    'mail.mail_activity_data_todo',
-                    summary=_('Revisión de aprobación financiera'),
-                    note=_('Revisar comrpobante de pago y actualizar el estado financiero de esta orden de venta al mayoreo.'),
-                    user_id=self.env.user.id,
-                    date_deadline=date_deadline,
-                )
+        # -------- Buscar y marcar la actividad de comprobante de pago como hecha -----------------------------
+        orders._wholesale_close_activities(stage='payment_pending')
 
-            # ----------------------------------------------------------------------
-            # Colocar estado en validacion
-            self.write({'data_finance_approval_status': 'validation'})
+        # ----------------------------------------------------------------------
+        # Creacion de actividad para verificacion del pago
+        # Se agenda la taarea para el mismo dia, colocandola como actividad para el mismo dia
+        now = datetime.now()
+        orders._wholesale_schedule_activity(
+            'wb_sale_wholesale_approval.group_finance_user',
+            stage='finance_review',
+            summary=_('Revisión de aprobación financiera'),
+            note=_('Revisar comrpobante de pago y actualizar el estado financiero de esta orden de venta al mayoreo.'),
+            date_deadline=now,
+        )
 
+        # ----------------------------------------------------------------------
+        # Colocar estado en validacion
+        orders.write({
+            'data_confirmation_date': now,
+            'data_finance_approval_status': 'validation',
+        })
+        return self - orders
+
+    def _wholesale_set_to_collected(self):
+        orders = self.filtered(lambda o: o.data_finance_approval_status == 'validation')
+        if not orders:
+            return self
 
-    def action_set_to_collected(self):
-        self.ensure_one()
-        if self.data_finance_approval_status in ['validation']:
         # --------------------------------------------------------------------------------
-            carrier = self.carrier_selection_relational
-
-            if carrier and carrier.name == 'Pick Up':  # Pickup
-                self.write({
-                    'data_finance_approval_status': 'collected',
-                    'yuju_carrier_tracking_ref': 'Pick-up',
-                    'data_total_carrier_tracking': 1,
-                    #'channel_order_reference': 1, # Ejemplo para local (No hay campo total de guias)
-                })
-            elif not carrier:
-                commercial_group = self.env.ref('wb_sale_wholesale_approval.group_sales_commercial_user')
-                commercial_user = self.env['res.users'].search([('groups_id', 'in', commercial_group.ids)], limit=1)
-                date_deadline_carrier = datetime.now()
-
-                # Crear actividad para comercial - asignacion de carrier y guia
-                if commercial_user:
-                    self.activity_schedule(
-                        'mail.mail_activity_data_todo',
-                        summary=_('Selección de carrier y generación de guía'),
-                        note=_('Favor de seleccionar carrier y generar la guía para esta orden.'),
-                        user_id=commercial_user.id,
-                        date_deadline=date_deadline_carrier,
-                    )
-                    self.write({'data_finance_approval_status': 'collected', })
-                else:
-                    self.activity_schedule(
-                        'mail.mail_activity_data_todo',
-                        summary=_('Selección de carrier y generación de guía'),
-                        note=_('Favor de seleccionar carrier y generar la guía para esta orden.'),
-                        user_id=self.env.user.id,
-                        date_deadline=date_deadline_carrier,
-                    )
-                    self.write({'data_finance_approval_status': 'collected', })
+        pickup_orders = orders.filtered(lambda o: o.carrier_selection_relational.name == 'Pick Up')
+        no_carrier_orders = orders.filtered(lambda o: not o.carrier_selection_relational)
 
-            else:
-                self.write({'data_finance_approval_status': 'collected', })
-
-            # -----------------------------------------------------------------------
-            # -------- Buscar y marcar la actividad de validacion de pago como hecha -----------------------------
-
-            # Referencia al tipo de actividad
-            activity_type_id = self.env.ref('mail.mail_activity_data_todo').id
-            # Referencia al modelo de la orden de venta
-            sale_order_model_id = self.env.ref('sale.model_sale_order').id
-
-            # Buscar la actividad con el dominio
-            activities_to_done = self.env['mail.activity'].search([
-                ('res_id', '=', self.id),
-                ('res_model_id', '=', sale_order_model_id),
-                ('activity_type_id', '=', activity_type_id),
-                ('summary', '=', 'Revisión de aprobación financiera')
-            ])
+        if pickup_orders:
+            pickup_orders.write({
+                'data_finance_approval_status': 'collected',
+                'yuju_carrier_tracking_ref': 'Pick-up',
+                'data_total_carrier_tracking': 1,
+                #'channel_order_reference': 1, # Ejemplo para local (No hay campo total de guias)
+            })
 
-            # Marcar las actividades encontradas como hechas
-            if activities_to_done:
-                activities_to_done.action_done()
+        if no_carrier_orders:
+            # Crear actividad para comercial - asignacion de carrier y guia
+            no_carrier_orders._wholesale_schedule_activity(
+                'wb_sale_wholesale_approval.group_sales_commercial_user',
+                stage='carrier_selection',
+                summary=_('Selección de carrier y generación de guía'),
+                note=_('Favor de seleccionar carrier y generar la guía para esta orden.'),
+                date_deadline=datetime.now(),
+            )
 
-    def action_set_to_rejected(self):
-        self.ensure_one()
-        if self.data_finance_approval_status in ['validation']:
+        (orders - pickup_orders).write({'data_finance_approval_status': 'collected'})
 
-            # Cerrar actividades pendientes relacionadas con esta orden
-            activities_to_done = self.env['mail.activity'].search([
-                ('res_id', '=', self.id),
-                ('res_model', '=', 'sale.order'),
-            ])
-            if activities_to_done:
-                activities_to_done.action_done()
-
-            # Validar que no haya fecha efectiva y que el estado WMS no sea Despachado
-            if not self.effective_date and self.wms_status != 'DESP':
-                # Cancelar la orden de venta
-                self.action_cancel()
-                self.message_post(
-                    body=_("La orden de venta ha sido cancelada debido al rechazo del pago.")
-                )
+        # -----------------------------------------------------------------------
+        # -------- Buscar y marcar la actividad de validacion de pago como hecha -----------------------------
+        orders._wholesale_close_activities(stage='finance_review')
+        return self - orders
+
+    def _wholesale_set_to_rejected(self):
+        orders = self.filtered(lambda o: o.data_finance_approval_status == 'validation')
+        if not orders:
+            return self
+
+        # Cerrar actividades pendientes relacionadas con estas ordenes
+        orders._wholesale_close_activities()
+
+        # Validar que no haya fecha efectiva y que el estado WMS no sea Despachado
+        to_cancel = orders.filtered(lambda o: not o.effective_date and o.wms_status != 'DESP')
+        if to_cancel:
+            # Cancelar las ordenes de venta. Se usa _action_cancel: action_cancel abre el asistente de
+            # cancelación (ensure_one) cuando alguna orden tiene facturas en borrador
+            to_cancel._action_cancel()
+        cancelled_body = _("La orden de venta ha sido cancelada debido al rechazo del pago.")
+        kept_body = _(
+            "El pago ha sido rechazado, pero la orden no fue cancelada porque ya tiene fecha efectiva y está despachada en WMS.")
+        for order in orders:
+            if order in to_cancel:
+                order.message_post(body=cancelled_body, data_wholesale_automated=True)
             else:
                 # Si no cumple condiciones, solo dejar el estado financiero en 'rejected'
-                self.message_post(
-                    body=_(
-                        "El pago ha sido rechazado, pero la orden no fue cancelada porque ya tiene fecha efectiva y está despachada en WMS.")
-                )
+                order.message_post(body=kept_body, data_wholesale_automated=True)
+        to_cancel._wholesale_mirror_to_channel(cancelled_body)
+        (orders - to_cancel)._wholesale_mirror_to_channel(kept_body)
+
+        orders.write({'data_finance_approval_status': 'rejected'})
+        return self - orders
 
-            self.write({'data_finance_approval_status': 'rejected'})
+    def _wholesale_schedule_activity(self, group_xmlid, stage, summary, note, date_deadline):
+        """Crea, con un solo ``create``, una actividad 'Por hacer' por orden, repartiendo
+        las asignaciones entre los miembros de ``group_xmlid`` según su carga actual."""
+        if not self:
+            return self.env['mail.activity']
+        assignee_ids = self.env['res.users']._wholesale_pick_assignees(group_xmlid, len(self))
+        return self.env['mail.activity'].create(
+            self._wholesale_prepare_activity_vals(stage, summary, note, date_deadline, assignee_ids)
+        )
+
+    def _wholesale_prepare_activity_vals(self, stage, summary, note, date_deadline, user_ids):
+        """Valores de creación de una actividad 'Por hacer' por orden; ``user_ids`` va en el mismo orden que ``self``."""
+        activity_type_id = self.env['wholesale.registry']._get_ref_id('mail.mail_activity_data_todo')
+        res_model_id = self.env['ir.model']._get_id('sale.order')
+        return [{
+            'activity_type_id': activity_type_id,
+            'data_wholesale_stage': stage,
+            'summary': summary,
+            'note': note,
+            'automated': True,
+            'date_deadline': fields.Date.to_date(date_deadline),
+            'res_model_id': res_model_id,
+            'res_id': order.id,
+            'user_id': user_id,
+        } for order, user_id in zip(self, user_ids)]
+
+    def _wholesale_close_activities(self, stage=False):
+        """Marca como hechas, con una sola búsqueda, las actividades de las órdenes.
+        Si se indica ``stage`` solo se cierran las actividades de esa etapa del flujo de mayoreo."""
+        if not self:
+            return
+        domain = [
+            ('res_model_id', '=', self.env['ir.model']._get_id('sale.order')),
+            ('res_id', 'in', self.ids),
+        ]
+        if stage:
+            domain.append(('data_wholesale_stage', '=', stage))
+        activities_to_done = self.env['mail.activity'].search(domain)
+        if activities_to_done:
+            # Los mensajes de 'actividad hecha' se marcan para el cron de depuración
+            messages, __ = activities_to_done._action_done()
+            messages.sudo().write({'data_wholesale_automated': True})
 
     # -------------------------------------------------------------------------------------------
     # Sobreescribir el método de confirmación
+    @wholesale_profiled(records_in_self)
     def action_confirm(self):
         res = super(SaleOrder, self).action_confirm()
-        if self.data_is_wholesale_sale:
-            finance_group = self.env.ref('wb_sale_wholesale_approval.group_finance_user')
-            finance_user = self.env['res.users'].search([('groups_id', 'in', finance_group.ids)], limit=1)
-
-            self.data_confirmation_date = datetime.now()
-            self.data_finance_approval_status = 'pending'
-
-            # ---------------------------------------------------------
-            if self.data_is_credit_sale and self.data_debit_amount == 0:
-                # Pago 100% a crédito, saltar a VALIDATION
-                self.data_finance_approval_status = 'validation'
-
-                # Crear actividad para revisión financiera directamente
-                date_deadline = datetime.now()
-                self.activity_schedule(
-                    'mail.mail_activity_data_todo',
-                    summary=_('Revisión de aprobación financiera'),
-                    note=_('Pago 100% con crédito: revisar y validar el crédito disponible del cliente.'),
-                    user_id=finance_user.id if finance_user else self.env.user.id,
-                    date_deadline=date_deadline,
-                )
-            else:
-                # Caso normal, va a PENDING comprobante
-                self.data_finance_approval_status = 'pending'
-                date_deadline = datetime.now() + timedelta(hours=72)
-
-                self.activity_schedule(
-                    'mail.mail_activity_data_todo',
-                    summary=_('Pendiente de comprobante de pago'),
-                    note=_('Dar seguimiento al envío del comprobante de pago correspondiente.'),
-                    user_id=finance_user.id if finance_user else self.env.user.id,
-                    date_deadline=date_deadline,
-                )
+        wholesale_orders = self.filtered('data_is_wholesale_sale')
+        if wholesale_orders:
+            wholesale_orders._wholesale_after_confirm()
+        return res
 
-            # -----------------------------------------------------------------------------
-            # Se suscribe a los usuarios de los grupos 'Ventas mayoreo',  'Finanzas' y Comercial a las ventas de mayoreo.
-            try:
-                wholesale_group = self.env.ref('wb_sale_wholesale_approval.group_sales_wholesale_user')
-                finance_group = self.env.ref('wb_sale_wholesale_approval.group_finance_user')
-                comercial_group = self.env.ref('wb_sale_wholesale_approval.group_sales_commercial_user')
+    def _wholesale_after_confirm(self):
+        """Estado financiero de las órdenes al mayoreo recién confirmadas. Las
+        actividades y los seguidores se encolan para no alargar la confirmación."""
+        now = datetime.now()
 
-            except ValueError:
-                return
+        # ---------------------------------------------------------
+        # Pago 100% a crédito salta a VALIDATION; el resto va a PENDING comprobante
+        credit_only_orders = self.filtered(lambda o: o.data_is_credit_sale and o.data_debit_amount == 0)
+        pending_orders = self - credit_only_orders
 
-            users_to_follow = self.env['res.users'].search([
-                ('groups_id', 'in', [wholesale_group.id, finance_group.id, comercial_group.id])
-            ])
+        if credit_only_orders:
+            credit_only_orders.write({
+                'data_confirmation_date': now,
+                'data_finance_approval_status': 'validation',
+            })
+        if pending_orders:
+            pending_orders.write({
+                'data_confirmation_date': now,
+                'data_finance_approval_status': 'pending',
+            })
 
-            partner_ids = users_to_follow.mapped('partner_id').ids
-            self.message_subscribe(partner_ids=partner_ids)
+        # La llave incluye la fecha de confirmación: una orden reconfirmada genera un trabajo nuevo
+        self.env['wholesale.job']._enqueue(
+            self, '_wholesale_job_after_confirm',
+            lambda order: 'sale.order.after_confirm:%d:%s' % (order.id, fields.Datetime.to_string(now)),
+        )
 
-        return res
+    def _wholesale_job_after_confirm(self):
+        """Trabajo diferido de la confirmación: actividades para Finanzas y seguidores.
+        Puede ejecutarse más de una vez; las órdenes que ya tienen su actividad se omiten.
+        Las actividades solo se crean si la orden sigue pendiente; los seguidores se
+        suscriben siempre, como en la confirmación síncrona."""
+        orders = self.filtered(lambda o: o.state in ('sale', 'done')
+                               and o.data_finance_approval_status in ('pending', 'validation'))
+        orders._wholesale_schedule_confirm_activities()
+        self._wholesale_subscribe_groups()
+
+    def _wholesale_schedule_confirm_activities(self):
+        """Actividad de revisión o de comprobante para Finanzas en las órdenes que aún no la tienen."""
+        if not self:
+            return
+        existing = self.env['mail.activity'].search([
+            ('res_model_id', '=', self.env['ir.model']._get_id('sale.order')),
+            ('res_id', 'in', self.ids),
+            ('data_wholesale_stage', 'in', ('finance_review', 'payment_pending')),
+        ])
+        scheduled_ids = set(existing.mapped('res_id'))
+        to_schedule = self.filtered(lambda o: o.id not in scheduled_ids)
+
+        # Crear todas las actividades con un solo create, repartidas entre Finanzas
+        credit_only_orders = to_schedule.filtered(lambda o: o.data_finance_approval_status == 'validation')
+        pending_orders = to_schedule - credit_only_orders
+        assignee_ids = self.env['res.users']._wholesale_pick_assignees(
+            'wb_sale_wholesale_approval.group_finance_user', len(to_schedule))
+        split = len(credit_only_orders)
+        activity_vals = credit_only_orders._wholesale_prepare_activity_vals(
+            stage='finance_review',
+            summary=_('Revisión de aprobación financiera'),
+            note=_('Pago 100% con crédito: revisar y validar el crédito disponible del cliente.'),
+            date_deadline=datetime.now(),
+            user_ids=assignee_ids[:split],
+        ) + pending_orders._wholesale_prepare_activity_vals(
+            stage='payment_pending',
+            summary=_('Pendiente de comprobante de pago'),
+            note=_('Dar seguimiento al envío del comprobante de pago correspondiente.'),
+            date_deadline=datetime.now(),
+            user_ids=assignee_ids[split:],
+        )
+        # El vencimiento se cuenta desde la confirmación, no desde la ejecución del trabajo
+        for order, vals in zip(credit_only_orders | pending_orders, activity_vals):
+            deadline = order.data_confirmation_date or datetime.now()
+            if order in pending_orders:
+                deadline += timedelta(hours=72)
+            vals['date_deadline'] = fields.Date.to_date(deadline)
+        if activity_vals:
+            self.env['mail.activity'].create(activity_vals)
+
+    def _wholesale_subscribe_groups(self):
+        # -----------------------------------------------------------------------------
+        # Se suscribe a los usuarios de los grupos 'Ventas mayoreo',  'Finanzas' y Comercial a las ventas de mayoreo.
+        # En modo canal los grupos siguen las órdenes desde el canal compartido (ver write)
+        if not self or self._wholesale_channel_mode():
+            return
+        registry = self.env['wholesale.registry']
+        user_ids = set()
+        for group_xmlid in WHOLESALE_FOLLOWER_GROUPS:
+            user_ids.update(registry._get_group_user_ids(group_xmlid))
+        users_to_follow = self.env['res.users'].sudo().browse(sorted(user_ids))
+
+        partner_ids = users_to_follow.mapped('partner_id').ids
+        self.message_subscribe(partner_ids=partner_ids)
+
+    def _wholesale_channel_mode(self):
+        return self.env['wholesale.registry']._get_param(NOTIFICATION_MODE_PARAM, 'followers') == 'channel'
+
+    def _wholesale_notify_channel(self, previous, to_status):
+        """Publica en el canal de mayoreo un solo mensaje con los cambios de estado financiero.
+
+        ``previous`` es una lista de ``(orden, estado_anterior, fecha_estado_anterior)``.
+        """
+        labels = dict(self._fields['data_finance_approval_status']._description_selection(self.env))
+        to_label = labels.get(to_status) or _('Cancelada')
+        details = [
+            (order, Markup('%s &#8594; %s') % (labels.get(from_status) or _('Confirmada'), to_label))
+            for order, from_status, __ in previous
+        ]
+        self._wholesale_post_to_channel(
+            _('Cambio de estado financiero en %s orden(es) de mayoreo:') % len(previous), details)
+
+    def _wholesale_mirror_to_channel(self, body):
+        """En modo canal, replica en el canal de mayoreo un aviso automático publicado
+        en el chatter de estas órdenes, con un solo mensaje para todo el lote."""
+        if self and self._wholesale_channel_mode():
+            self._wholesale_post_to_channel(
+                _('%s (%s orden(es) de mayoreo):') % (body.rstrip('.'), len(self)), [(order, '') for order in self])
+
+    def _wholesale_post_to_channel(self, header, details):
+        """``details`` es una lista de ``(orden, texto)``; el texto puede ir vacío."""
+        channel = self.env['wholesale.registry']._ref('wb_sale_wholesale_approval.channel_wholesale_orders')
+        lines = Markup('').join(
+            Markup('<li><a href="#" data-oe-model="sale.order" data-oe-id="%s">%s</a> (%s)%s</li>') % (
+                order.id, order.name, order.partner_id.display_name,
+                Markup(': %s') % text if text else '',
+            )
+            for order, text in details
+        )
+        channel.sudo().message_post(
+            body=Markup('<p>%s</p><ul>%s</ul>') % (header, lines),
+            message_type='comment',
+            subtype_xmlid='mail.mt_comment',
+        )
 
     # -------------------------------------------------------------------------------------------
     # Sobreescribir el método de cancelar
+    @wholesale_profiled(records_in_self)
     def action_cancel(self):
-        for order in self:
-            if order.data_is_wholesale_sale:
-                # Cerrar actividades pendientes
-                activities_to_done = self.env['mail.activity'].search([
-                    ('res_id', '=', order.id),
-                    ('res_model', '=', 'sale.order'),
-                ])
+        return super(SaleOrder, self).action_cancel()
 
-                if activities_to_done:
-                    activities_to_done.action_done()
+    def _action_cancel(self):
+        # La limpieza va aquí y no en action_cancel, que puede devolver el asistente de
+        # cancelación sin cancelar; así también aplica al rechazo de pago y al cron
+        wholesale_orders = self.filtered('data_is_wholesale_sale')
+        if wholesale_orders:
+            # Cerrar actividades pendientes
+            wholesale_orders._wholesale_close_activities()
 
-                # Limpiar estado financiero
-                order.data_finance_approval_status = False
+            # Limpiar estado financiero
+            wholesale_orders.write({'data_finance_approval_status': False})
 
-        return super(SaleOrder, self).action_cancel()
+        return super(SaleOrder, self)._action_cancel()
 
 
     # -------------------------------------------------------------------------------------------
@@ -263,60 +470,280 @@ class SaleOrder(models.Model):
     def write(self, vals):
         # Verificacion de equipo de ventas 'Team_Mayoreo' para edicion con Write
         if vals.get('data_is_wholesale_sale'):
-            team_mayoreo = self.env['crm.team'].search([('name', '=', 'Team_Mayoreo')], limit=1)
-            if team_mayoreo:
-                vals['team_id'] = team_mayoreo.id
+            companies = self.company_id
+            if len(companies) > 1:
+                # El equipo de mayoreo se configura por compañía: escribir cada compañía por separado
+                for company in companies:
+                    self.filtered(lambda o: o.company_id == company).write(dict(vals))
+                return True
+            company = companies or self.env.company
+            team_mayoreo_id = self.env['wholesale.registry']._get_wholesale_team_id(company.id)
+            if team_mayoreo_id:
+                vals['team_id'] = team_mayoreo_id
 
-        if self.data_is_wholesale_sale:
-            if 'yuju_carrier_tracking_ref' in vals and vals['yuju_carrier_tracking_ref']:
-                for order in self:
-                    carrier_activities = self.env['mail.activity'].search([
-                        ('res_id', '=', order.id),
-                        ('res_model', '=', 'sale.order'),
-                        ('summary', '=', 'Selección de carrier y generación de guía')
-                    ])
-                    if carrier_activities:
-                        carrier_activities.action_done()
+        # Al registrar la guía se cierran, con una sola búsqueda, las actividades de carrier de las órdenes al mayoreo
+        if vals.get('yuju_carrier_tracking_ref'):
+            if vals.get('data_is_wholesale_sale'):
+                wholesale_orders = self
+            else:
+                wholesale_orders = self.filtered('data_is_wholesale_sale')
+            wholesale_orders._wholesale_close_activities(stage='carrier_selection')
+
+        # Registrar en la bitácora los cambios de estado financiero
+        if 'data_finance_approval_status' in vals:
+            to_status = vals['data_finance_approval_status']
+            changed = self.filtered(lambda o: o.data_finance_approval_status != to_status)
+            if not changed:
+                return super().write(vals)
+            now = fields.Datetime.now()
+            previous = [(o, o.data_finance_approval_status, o.data_finance_status_date) for o in changed]
+            if changed == self:
+                res = super().write(dict(vals, data_finance_status_date=now))
+            else:
+                res = super().write(vals)
+                super(SaleOrder, changed).write({'data_finance_status_date': now})
+            self.env['wholesale.finance.transition']._log_transitions(previous, to_status, now)
+            if self._wholesale_channel_mode():
+                changed._wholesale_notify_channel(previous, to_status)
+            return res
 
         return super().write(vals)
 
     # --------------------------------------------------------------------------------
     # Si es mayoreo, asignar team_id 'Team_Mayoreo' -  Reiteramos que es este equipo de ventas porque lo modifica al crear el record
+    @api.model_create_multi
+    def create(self, vals_list):
+        registry = self.env['wholesale.registry']
+        for vals in vals_list:
+            if vals.get('data_is_wholesale_sale'):
+                company_id = vals.get('company_id') or self.env.company.id
+                team_mayoreo_id = registry._get_wholesale_team_id(company_id)
+                if team_mayoreo_id:
+                    vals['team_id'] = team_mayoreo_id
+        return super().create(vals_list)
+
+    # --------------------------------------------------------------------------------
+    # Ingesta de órdenes al mayoreo por lotes (ver controllers/main.py)
     @api.model
-    def create(self, vals):
-        if vals.get('data_is_wholesale_sale'):
-            team_mayoreo = self.env['crm.team'].search([('name', '=', 'Team_Mayoreo')], limit=1)
-            if team_mayoreo:
-                vals['team_id'] = team_mayoreo.id
-        return super().create(vals)
+    @wholesale_profiled(lambda self, result: len(result['order_ids']))
+    def _wholesale_ingest_batch(self, orders_data, confirm=False):
+        """
+        Crea en un solo ``create`` un lote de órdenes al mayoreo.
+
+        Cada elemento de ``orders_data`` es un diccionario con:
+
+        - ``partner_id`` (int) o ``partner_ref`` (referencia interna del cliente)
+        - ``client_order_ref`` (opcional): las órdenes cuya referencia ya existe
+          para el cliente se omiten, de modo que reenviar un lote es inofensivo
+        - ``credit_amount`` (opcional): monto pagado con crédito
+        - ``lines``: lista de ``{'product_id' o 'default_code', 'quantity', 'price_unit' (opcional)}``
+
+        Todo el lote se valida antes de crear, incluido el tipo de cada campo;
+        si hay errores se lanza un ``UserError`` con la lista completa. Clientes
+        y productos se resuelven con una búsqueda cada uno. Con ``confirm`` las
+        órdenes se confirman con el flujo de mayoreo.
+
+        Devuelve ``{'order_ids': [...], 'names': [...], 'existing_ids': [...]}``.
+        """
+        if not isinstance(orders_data, list) or not orders_data:
+            raise UserError(_('El lote de órdenes está vacío.'))
+        if len(orders_data) > INGEST_MAX_BATCH_SIZE:
+            raise UserError(_('El lote excede el máximo de %s órdenes.') % INGEST_MAX_BATCH_SIZE)
+
+        Partner = self.env['res.partner']
+        Product = self.env['product.product']
+
+        # Validar tipos primero: las órdenes mal formadas no entran a las búsquedas
+        errors = []
+        valid_data = {}
+        for index, data in enumerate(orders_data, start=1):
+            type_errors = self._wholesale_ingest_type_errors(index, data)
+            errors.extend(type_errors)
+            if not type_errors:
+                valid_data[index] = data
+
+        # Resolver clientes y productos con una búsqueda cada uno
+        partner_ids = {d['partner_id'] for d in valid_data.values() if d.get('partner_id')}
+        partner_refs = {d['partner_ref'] for d in valid_data.values() if not d.get('partner_id') and d.get('partner_ref')}
+        partners = Partner.search(['|', ('id', 'in', list(partner_ids)), ('ref', 'in', list(partner_refs))]) \
+            if partner_ids or partner_refs else Partner
+        partner_by_id = {p.id: p for p in partners}
+        partner_by_ref = {p.ref: p for p in partners if p.ref}
+
+        lines_data = [line for d in valid_data.values() for line in (d.get('lines') or [])]
+        product_ids = {l['product_id'] for l in lines_data if l.get('product_id')}
+        product_codes = {l['default_code'] for l in lines_data if not l.get('product_id') and l.get('default_code')}
+        products = Product.search(['|', ('id', 'in', list(product_ids)), ('default_code', 'in', list(product_codes))]) \
+            if product_ids or product_codes else Product
+        product_by_id = {p.id: p for p in products}
+        product_by_code = {p.default_code: p for p in products if p.default_code}
+
+        resolved = []
+        for index, data in valid_data.items():
+            partner = partner_by_id.get(data.get('partner_id')) or partner_by_ref.get(data.get('partner_ref'))
+            if not partner:
+                errors.append(_('Orden %s: cliente no encontrado.') % index)
+            if not data.get('lines'):
+                errors.append(_('Orden %s: no tiene líneas.') % index)
+            line_vals = []
+            for line_index, line in enumerate(data.get('lines') or [], start=1):
+                product = product_by_id.get(line.get('product_id')) or product_by_code.get(line.get('default_code'))
+                quantity = line.get('quantity') or 0
+                if not product:
+                    errors.append(_('Orden %s, línea %s: producto no encontrado.') % (index, line_index))
+                elif not product.sale_ok:
+                    errors.append(_('Orden %s, línea %s: el producto %s no se puede vender.') % (
+                        index, line_index, product.display_name))
+                if quantity <= 0:
+                    errors.append(_('Orden %s, línea %s: la cantidad debe ser mayor a cero.') % (index, line_index))
+                if product:
+                    vals = {'product_id': product.id, 'product_uom_qty': quantity}
+                    if 'price_unit' in line:
+                        vals['price_unit'] = line['price_unit']
+                    line_vals.append(fields.Command.create(vals))
+            resolved.append((data, partner, line_vals))
+        if errors:
+            raise UserError('\n'.join(errors))
+
+        # Omitir las órdenes ya ingresadas (misma referencia del cliente y mismo cliente)
+        refs = {d.get('client_order_ref') for d, __, __ in resolved if d.get('client_order_ref')}
+        existing = self.browse()
+        existing_keys = {}
+        if refs:
+            existing = self.search([
+                ('client_order_ref', 'in', list(refs)),
+                ('partner_id', 'in', partners.ids),
+                ('data_is_wholesale_sale', '=', True),
+            ])
+            existing_keys = {(o.partner_id.id, o.client_order_ref): o.id for o in existing}
+
+        registry = self.env['wholesale.registry']
+        company_id = self.env.company.id
+        warehouse_id = registry._get_wholesale_warehouse_id(company_id)
+        vals_list = []
+        existing_ids = []
+        for data, partner, line_vals in resolved:
+            ref = data.get('client_order_ref')
+            if ref and (partner.id, ref) in existing_keys:
+                existing_ids.append(existing_keys[(partner.id, ref)])
+                continue
+            vals = {
+                'partner_id': partner.id,
+                'client_order_ref': ref or False,
+                'company_id': company_id,
+                'data_is_wholesale_sale': True,
+                'order_line': line_vals,
+            }
+            if warehouse_id:
+                vals['warehouse_id'] = warehouse_id
+            if data.get('credit_amount'):
+                vals.update({'data_is_credit_sale': True, 'data_credit_amount': data['credit_amount']})
+            vals_list.append(vals)
+
+        orders = self.create(vals_list) if vals_list else self.browse()
+        if confirm and orders:
+            orders.action_confirm()
+
+        _logger.info("Ingesta de mayoreo: %d órdenes creadas, %d ya existían.", len(orders), len(existing_ids))
+        return {
+            'order_ids': orders.ids,
+            'names': orders.mapped('name'),
+            'existing_ids': existing_ids,
+        }
+
+    def _wholesale_ingest_type_errors(self, index, data):
+        """Devuelve los errores de tipo de la orden ``index`` del lote. Los campos
+        opcionales pueden venir vacíos (``None`` o ``False``)."""
+        labels = {
+            'id': _('un entero'),
+            'text': _('texto'),
+            'number': _('un número'),
+            'list': _('una lista'),
+        }
+
+        def check(value, kind):
+            if value is None or value is False:
+                return True
+            if kind == 'id':
+                return isinstance(value, int) and not isinstance(value, bool)
+            if kind == 'text':
+                return isinstance(value, str)
+            if kind == 'number':
+                return isinstance(value, (int, float)) and not isinstance(value, bool)
+            return isinstance(value, list)
+
+        if not isinstance(data, dict):
+            return [_('Orden %s: debe ser un objeto.') % index]
+        errors = [
+            _('Orden %s: el campo %s debe ser %s.') % (index, name, labels[kind])
+            for name, kind in INGEST_ORDER_TYPES.items() if not check(data.get(name), kind)
+        ]
+        if not check(data.get('lines'), 'list'):
+            return errors
+        for line_index, line in enumerate(data.get('lines') or [], start=1):
+            if not isinstance(line, dict):
+                errors.append(_('Orden %s, línea %s: debe ser un objeto.') % (index, line_index))
+                continue
+            errors.extend(
+                _('Orden %s, línea %s: el campo %s debe ser %s.') % (index, line_index, name, labels[kind])
+                for name, kind in INGEST_LINE_TYPES.items() if not check(line.get(name), kind)
+            )
+        return errors
 
     # -----------------------------------------------------------------------------------
     @api.onchange('data_is_wholesale_sale')
     def _onchange_data_is_wholesale_sale(self):
         if self.data_is_wholesale_sale:
-            team_mayoreo = self.env['crm.team'].search([('name', '=', 'Team_Mayoreo')], limit=1)
-            if team_mayoreo:
-                self.team_id = team_mayoreo.id
+            registry = self.env['wholesale.registry']
+            company_id = (self.company_id or self.env.company).id
+            team_mayoreo_id = registry._get_wholesale_team_id(company_id)
+            if team_mayoreo_id:
+                self.team_id = team_mayoreo_id
 
-            almacen_general = self.env['stock.warehouse'].search([('name', '=', 'Almacen General')], limit=1)
-            if almacen_general:
-                self.warehouse_id = almacen_general.id
+            almacen_general_id = registry._get_wholesale_warehouse_id(company_id)
+            if almacen_general_id:
+                self.warehouse_id = almacen_general_id
         else:
             pass
 
     # ----------------------------------------------------------------------------------
 
-    # Lógica para la cancelación automática después de 144 horas
+    # Lógica para la cancelación automática después de 144 horas (configurable)
     @api.model
-    def _cron_auto_cancel_old_orders(self):
+    @wholesale_profiled(lambda self, result: result['processed'])
+    def _cron_auto_cancel_old_orders(self, batch_size=AUTO_CANCEL_BATCH_SIZE, time_budget=AUTO_CANCEL_TIME_BUDGET,
+                                     full_sweep=False):
         """
         Cancela automáticamente las órdenes de venta al mayoreo que han
-        superado las 144 horas desde su confirmación.
+        superado el plazo configurado (144 horas por defecto) desde su confirmación.
+
+        Las órdenes se recorren en lotes ordenados por (fecha de confirmación, id),
+        con un commit al terminar cada lote. Al final se guarda la marca de agua
+        (fecha e id de la última orden revisada antes de la primera orden omitida
+        por estar bloqueada por otra transacción), de modo que las ejecuciones
+        siguientes vuelven a intentar esas órdenes y revisan las que cruzaron el
+        plazo desde entonces. Las órdenes con error no detienen la marca: se
+        registran como advertencia y las reintenta la revisión completa.
+        Si se agota el tiempo disponible (``time_budget`` en segundos) el cron se
+        vuelve a disparar para continuar desde la marca.
+
+        Con ``full_sweep`` se revisa toda la ventana sin usar ni mover la marca,
+        lo que recoge las órdenes que fallaron en ejecuciones anteriores;
+        si se agota el tiempo, la revisión completa se vuelve a disparar y, como
+        las órdenes ya canceladas salen del dominio, continúa donde se quedó.
         """
         _logger.info("El cron de cancelación de órdenes se está ejecutando.")
+        start = time.monotonic()
+        stats = {'processed': 0, 'skipped': 0, 'failed': 0}
 
-        # Define la fecha límite: hace 144 horas (6 días)
-        limit_date = datetime.now() - timedelta(hours=144)
+        # Define la fecha límite según el plazo configurado
+        threshold_hours = self.env['wholesale.registry']._get_int_param(
+            AUTO_CANCEL_THRESHOLD_PARAM, AUTO_CANCEL_THRESHOLD_HOURS)
+        limit_date = datetime.now() - timedelta(hours=threshold_hours)
+        start_mark = (False, 0) if full_sweep else self._wholesale_get_auto_cancel_watermark()
+        # cursor: posición de la búsqueda; safe_mark: hasta dónde no quedan órdenes bloqueadas
+        cursor = safe_mark = start_mark
+        held = False
 
         # Busca las órdenes que cumplen las condiciones:
         domain = [
@@ -324,47 +751,266 @@ class SaleOrder(models.Model):
             ('data_finance_approval_status', '=', 'pending'),  # Sigue con estado financiero 'Pendiente de Pago'
             ('state', 'in', ['sale', 'done']),  # Estado de la orden 'Orden de vcenta' o 'Bloqueado'
             ('data_confirmation_date', '<', limit_date.strftime('%Y-%m-%d %H:%M:%S'))
-            # Ordenes con mas de 144 horas de confirmadas
+            # Ordenes que superaron el plazo desde su confirmación
         ]
-        old_orders = self.env['sale.order'].search(domain)
-        _logger.info("Se encontraron %d órdenes antiguas que serán canceladas.", len(old_orders))
-
-        # Cancela las órdenes encontradas
-        for order in old_orders:
-            # Cancela la orden
-            # Logica de cerrar actividades y status financiero a False, estan de action_cancel de este script
-            order.action_cancel()
-            order.message_post(
-                body="La orden de venta ha sido cancelada automáticamente por superar el plazo de 6 días sin confirmación de pago.")
-            _logger.info("La orden de venta %s ha sido cancelada.", order.name)
-        _logger.info("El cron de cancelación de órdenes ha finalizado.")
+        message_body = _(
+            "La orden de venta ha sido cancelada automáticamente por superar el plazo de %s horas sin confirmación de pago."
+        ) % threshold_hours
+
+        finished = False
+        while True:
+            keyset = []
+            cursor_date, cursor_id = cursor
+            if cursor_date:
+                keyset = [
+                    '|', ('data_confirmation_date', '>', cursor_date),
+                    '&', ('data_confirmation_date', '=', cursor_date), ('id', '>', cursor_id),
+                ]
+            batch = self.env['sale.order'].search(domain + keyset, order='data_confirmation_date, id', limit=batch_size)
+            if not batch:
+                finished = True
+                break
+            cursor = (batch[-1].data_confirmation_date, batch[-1].id)
+
+            # Bloquear el lote; las órdenes tomadas por otra transacción se omiten
+            locked_ids = batch._wholesale_lock_skip_locked()
+            stats['skipped'] += len(batch) - len(locked_ids)
+
+            # Cancela las órdenes encontradas, en el orden de la marca de agua
+            cancelled_orders = self.env['sale.order']
+            for order in batch:
+                if order.id in locked_ids:
+                    try:
+                        with self.env.cr.savepoint():
+                            # Logica de cerrar actividades y status financiero a False, estan en _action_cancel de este script
+                            order._action_cancel()
+                            order.message_post(body=message_body, data_wholesale_automated=True)
+                        cancelled_orders |= order
+                        stats['processed'] += 1
+                        _logger.info("La orden de venta %s ha sido cancelada.", order.name)
+                    except Exception:
+                        stats['failed'] += 1
+                        _logger.exception("No se pudo cancelar la orden de venta %s.", order.name)
+                        if not full_sweep:
+                            _logger.warning(
+                                "La orden de venta %s queda atrás de la marca de agua; "
+                                "la reintentará la revisión completa.", order.name)
+                # La marca no pasa de la primera orden bloqueada: se reintenta en la siguiente ejecución
+                if not held:
+                    if order.id in locked_ids:
+                        safe_mark = (order.data_confirmation_date, order.id)
+                    else:
+                        held = True
+            cancelled_orders._wholesale_mirror_to_channel(message_body)
+
+            self._wholesale_commit()
+
+            if len(batch) < batch_size:
+                finished = True
+                break
+            if time.monotonic() - start >= time_budget:
+                break
+
+        if not full_sweep and safe_mark != start_mark:
+            self._wholesale_set_auto_cancel_watermark(*safe_mark)
+            self._wholesale_commit()
+        if not finished:
+            _logger.info("Se agotó el tiempo del cron de cancelación; se continuará después de la orden con id %d.",
+                         safe_mark[1])
+            cron_xmlid = 'wb_sale_wholesale_approval.ir_cron_auto_cancel_old_orders'
+            if full_sweep:
+                cron_xmlid += '_full_sweep'
+            self.env['wholesale.registry']._ref(cron_xmlid)._trigger()
+
+        _logger.info(
+            "El cron de cancelación de órdenes ha finalizado: %(processed)d canceladas, "
+            "%(skipped)d omitidas, %(failed)d con error.", stats)
+        return stats
+
+    def _wholesale_lock_skip_locked(self):
+        """Bloquea las órdenes para esta transacción y devuelve el conjunto de ids
+        bloqueados; las que ya bloqueó otra transacción se omiten."""
+        if not self:
+            return set()
+        self.env.cr.execute("SELECT id FROM sale_order WHERE id IN %s FOR UPDATE SKIP LOCKED", [tuple(self.ids)])
+        return {row[0] for row in self.env.cr.fetchall()}
+
+    @api.model
+    def _wholesale_get_auto_cancel_watermark(self):
+        """Devuelve ``(fecha, id)`` de la última orden revisada por el cron, o ``(False, 0)``."""
+        value = self.env['ir.config_parameter'].sudo().get_param(AUTO_CANCEL_WATERMARK_PARAM)
+        if not value:
+            return False, 0
+        date_str, __, order_id = value.partition('|')
+        return fields.Datetime.to_datetime(date_str), int(order_id or 0)
+
+    @api.model
+    def _wholesale_set_auto_cancel_watermark(self, mark_date, mark_id):
+        self.env['ir.config_parameter'].sudo().set_param(
+            AUTO_CANCEL_WATERMARK_PARAM, '%s|%d' % (fields.Datetime.to_string(mark_date), mark_id))
+
+    # ----------------------------------------------------------------------------------
+    # Depuración de actividades y mensajes automáticos de órdenes terminadas
+    @api.model
+    @wholesale_profiled(lambda self, result: result['orders'])
+    def _cron_cleanup_finished_orders(self, batch_size=CLEANUP_BATCH_SIZE, time_budget=CLEANUP_TIME_BUDGET):
+        """
+        Depura las órdenes al mayoreo cobradas, rechazadas o canceladas cuyo último
+        cambio de estado financiero es anterior al periodo de retención configurado
+        (180 días por defecto): elimina sus actividades abiertas del flujo y los mensajes
+        automáticos (con sus notificaciones) y deja en la orden un resumen
+        de una línea. Los cambios de estado quedan en wholesale.finance.transition.
+
+        Las órdenes se recorren en lotes por id con un commit al terminar cada lote;
+        si se agota el tiempo disponible el cron se vuelve a disparar.
+        """
+        start = time.monotonic()
+        retention_days = self.env['wholesale.registry']._get_int_param(
+            CLEANUP_RETENTION_PARAM, CLEANUP_RETENTION_DAYS)
+        limit_date = fields.Datetime.now() - timedelta(days=retention_days)
+        res_model_id = self.env['ir.model']._get_id('sale.order')
+        stats = {'orders': 0, 'activities': 0, 'messages': 0}
+
+        self.flush_model(['data_is_wholesale_sale', 'data_wholesale_archived', 'data_finance_approval_status',
+                          'state', 'data_finance_status_date'])
+        last_id = 0
+        while True:
+            self.env.cr.execute("""
+                SELECT id, data_finance_approval_status, state
+                  FROM sale_order
+                 WHERE id > %s
+                   AND data_is_wholesale_sale
+                   AND data_wholesale_archived IS NOT TRUE
+                   AND (data_finance_approval_status IN ('collected', 'rejected') OR state = 'cancel')
+                   AND COALESCE(data_finance_status_date, write_date) < %s
+              ORDER BY id
+                 LIMIT %s
+                   FOR UPDATE SKIP LOCKED
+            """, [last_id, limit_date, batch_size])
+            rows = self.env.cr.fetchall()
+            if not rows:
+                break
+            order_ids = [row[0] for row in rows]
+            last_id = order_ids[-1]
+
+            # Conteos por orden antes de borrar, para el resumen
+            # Solo las actividades del flujo de mayoreo; las que los usuarios agendaron a mano se conservan
+            activities = self.env['mail.activity'].sudo().search([
+                ('res_model_id', '=', res_model_id), ('res_id', 'in', order_ids),
+                ('data_wholesale_stage', '!=', False)])
+            messages = self.env['mail.message'].sudo().search([
+                ('model', '=', 'sale.order'), ('res_id', 'in', order_ids), ('data_wholesale_automated', '=', True)])
+            activity_count = Counter(activities.mapped('res_id'))
+            message_count = Counter(messages.mapped('res_id'))
+
+            activities.unlink()
+            messages.unlink()
+
+            labels = dict(self._fields['data_finance_approval_status']._description_selection(self.env))
+            today = fields.Date.to_string(fields.Date.context_today(self))
+            summaries = [
+                _('Historial depurado el %(date)s (%(status)s): %(activities)s actividades y %(messages)s mensajes automáticos.') % {
+                    'date': today,
+                    'status': labels.get(status) or _('Cancelada'),
+                    'activities': activity_count[order_id],
+                    'messages': message_count[order_id],
+                }
+                for order_id, status, __ in rows
+            ]
+            self.env.cr.execute("""
+                UPDATE sale_order so
+                   SET data_wholesale_archived = TRUE,
+                       data_wholesale_archive_summary = t.summary
+                  FROM unnest(%s::int[], %s::varchar[]) AS t(order_id, summary)
+                 WHERE so.id = t.order_id
+            """, [order_ids, summaries])
+            self.invalidate_model(['data_wholesale_archived', 'data_wholesale_archive_summary'])
+
+            stats['orders'] += len(order_ids)
+            stats['activities'] += len(activities)
+            stats['messages'] += len(messages)
+            self._wholesale_commit()
+
+            if len(rows) < batch_size:
+                break
+            if time.monotonic() - start >= time_budget:
+                self.env['wholesale.registry']._ref(
+                    'wb_sale_wholesale_approval.ir_cron_cleanup_finished_orders')._trigger()
+                break
+
+        _logger.info(
+            "Depuración de órdenes al mayoreo: %(orders)d órdenes, %(activities)d actividades y "
+            "%(messages)d mensajes eliminados.", stats)
+        return stats
+
+    def _wholesale_commit(self):
+        """Confirma la transacción actual, excepto al correr pruebas."""
+        if not self.env.registry.in_test_mode():
+            self.env.cr.commit()
 
     # ----------------------------------------------------------------------------------
     # Lógica para el aviso en el chatter de órdenes pendientes
     @api.model
-    def _cron_send_payment_reminder_message(self):
+    @wholesale_profiled(lambda self, result: result['reminded'])
+    def _cron_send_payment_reminder_message(self, interval_days=PAYMENT_REMINDER_INTERVAL_DAYS):
+        """
+        Publica un aviso de pago vencido en las órdenes al mayoreo pendientes
+        de comprobante cuya actividad ya venció. Una sola consulta une las
+        actividades con las órdenes y descarta las que ya recibieron aviso en
+        los últimos ``interval_days`` días (bitácora ``wholesale.payment.reminder``).
+        """
         _logger.info("El cron de aviso 'pago pendiente ventas mayoreo' se está ejecutando.")
 
-        activity_type_id = self.env.ref('mail.mail_activity_data_todo').id
-        now = datetime.now()
+        today = fields.Date.context_today(self)
+        reminder_since = today - timedelta(days=interval_days - 1)
 
-        overdue_activities = self.env['mail.activity'].search([
-            ('res_model_id', '=', self.env.ref('sale.model_sale_order').id),
-            ('activity_type_id', '=', activity_type_id),
-            ('date_deadline', '<', now)
-        ])
+        self.env['mail.activity'].flush_model(['res_model_id', 'res_id', 'data_wholesale_stage', 'date_deadline'])
+        self.env['sale.order'].flush_model(['state', 'data_is_wholesale_sale', 'data_finance_approval_status'])
+        self.env['wholesale.payment.reminder'].flush_model(['order_id', 'reminder_date'])
+        self.env.cr.execute("""
+            SELECT DISTINCT so.id
+              FROM mail_activity ma
+              JOIN sale_order so ON so.id = ma.res_id
+             WHERE ma.res_model_id = %s
+               AND ma.data_wholesale_stage = 'payment_pending'
+               AND ma.date_deadline < %s
+               AND so.data_is_wholesale_sale
+               AND so.data_finance_approval_status = 'pending'
+               AND so.state IN ('sale', 'done')
+               AND NOT EXISTS (
+                    SELECT 1
+                      FROM wholesale_payment_reminder r
+                     WHERE r.order_id = so.id
+                       AND r.reminder_date >= %s
+               )
+        """, [self.env['ir.model']._get_id('sale.order'), today, reminder_since])
+        orders_to_remind = self.env['sale.order'].browse([row[0] for row in self.env.cr.fetchall()])
+
+        _logger.info("Se encontraron %d órdenes de venta que necesitan un aviso de pago.", len(orders_to_remind))
 
-        orders_to_remind = self.env['sale.order'].search([
-            ('id', 'in', overdue_activities.mapped('res_id')),
-            ('state', 'in', ['sale', 'done']),
-            ('data_is_wholesale_sale', '=', True),
-            ('data_finance_approval_status', '=', 'pending'),
+        mode = self.env['wholesale.registry']._get_param(PAYMENT_REMINDER_MODE_PARAM, 'per_order')
+        if mode == 'digest':
+            reminded = orders_to_remind._wholesale_send_payment_digest()
+        else:
+            reminded = orders_to_remind._wholesale_post_payment_reminders()
+
+        # Registrar los avisos enviados en una sola inserción
+        self.env['wholesale.payment.reminder'].create([
+            {'order_id': order.id, 'reminder_date': today} for order in reminded
         ])
 
-        _logger.info("Se encontraron %d órdenes de venta que necesitan un aviso de pago.", len(orders_to_remind))
+        # Depurar avisos fuera del intervalo para mantener la bitácora pequeña
+        self.env['wholesale.payment.reminder'].search([('reminder_date', '<', reminder_since)]).unlink()
+
+        _logger.info("El cron de aviso 'pago pendiente ventas mayoreo' ha finalizado.")
+        return {'reminded': len(reminded)}
 
-        for order in orders_to_remind:
-            message_body = "El pago de esta orden de venta al mayoreo está vencido. Por favor, revísalo y actualiza el estado financiero."
+    def _wholesale_post_payment_reminders(self):
+        """Un comentario en el chatter de cada orden, firmado por su vendedor.
+        Devuelve las órdenes avisadas."""
+        reminded = self.env['sale.order']
+        message_body = _("El pago de esta orden de venta al mayoreo está vencido. Por favor, revísalo y actualiza el estado financiero.")
+        for order in self:
 
             # Obtiene el ID del vendedor asignado a la orden
             if order.user_id:
@@ -373,12 +1019,50 @@ class SaleOrder(models.Model):
                     body=message_body,
                     message_type='comment',
                     subtype_xmlid='mail.mt_comment',
-                    author_id=author_id
+                    author_id=author_id,
+                    data_wholesale_automated=True,
                 )
+                reminded |= order
                 _logger.info("Se envió un aviso para la orden %s, remitente: %s.", order.name,
                              order.user_id.name)
             else:
                 _logger.warning("No se encontró un vendedor asignado para la orden %s. No se pudo enviar el aviso.",
                                 order.name)
+        reminded._wholesale_mirror_to_channel(message_body)
+        return reminded
+
+    def _wholesale_send_payment_digest(self):
+        """Un solo aviso por vendedor con la lista de sus órdenes vencidas, enviado con
+        ``message_notify`` para no publicar en el chatter de cada orden ni avisar a sus seguidores.
+        Devuelve las órdenes incluidas en algún resumen."""
+        reminded = self.env['sale.order']
+        for user, orders in self._wholesale_group_by_salesperson():
+            if not user:
+                _logger.warning("Órdenes sin vendedor asignado, sin aviso de pago: %s.", ', '.join(orders.mapped('name')))
+                continue
+            lines = Markup('').join(
+                Markup('<li><a href="/web#model=sale.order&amp;id=%s">%s</a>: %s, %s</li>') % (
+                    order.id, order.name, order.partner_id.display_name,
+                    format_amount(self.env, order.amount_total, order.currency_id),
+                )
+                for order in orders
+            )
+            self.env['mail.thread'].with_context(lang=user.lang).message_notify(
+                partner_ids=user.partner_id.ids,
+                subject=_('Pagos vencidos de ventas al mayoreo (%s)') % len(orders),
+                body=Markup('<p>%s</p><ul>%s</ul>') % (
+                    _('El pago de estas órdenes de venta al mayoreo está vencido. '
+                      'Por favor, revísalas y actualiza el estado financiero.'), lines),
+                email_layout_xmlid='mail.mail_notification_light',
+            )
+            reminded |= orders
+            _logger.info("Se envió un resumen de %d avisos de pago a %s.", len(orders), user.name)
+        return reminded
 
-        _logger.info("El cron de aviso 'pago pendiente ventas mayoreo' ha finalizado.")
\ No newline at end of file
+    def _wholesale_group_by_salesperson(self):
+        """Devuelve ``[(vendedor, órdenes), ...]`` en el orden de ``self``."""
+        groups = {}
+        for order in self:
+            groups.setdefault(order.user_id, self.env['sale.order'])
+            groups[order.user_id] |= order
+        return list(groups.items())
\ No newline at end of file
@@ -1,6 +1,20 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api
 from odoo.exceptions import ValidationError
+from odoo.tools import float_is_zero
+from odoo.tools.sql import column_exists, create_column
+
+# Estados financieros en los que el crédito de la orden está comprometido
+CREDIT_EXPOSURE_STATUSES = ('pending', 'validation')
+# Campos cuya escritura puede cambiar el crédito comprometido de una orden
+CREDIT_EXPOSURE_TRIGGER_FIELDS = {
+    'state', 'data_finance_approval_status', 'data_is_wholesale_sale',
+    'data_is_credit_sale', 'data_credit_amount', 'order_line', 'partner_id',
+}
+# Campos de sale.order.line que cambian el total de la orden
+CREDIT_EXPOSURE_LINE_TRIGGER_FIELDS = {
+    'product_id', 'product_uom_qty', 'product_uom', 'price_unit', 'discount', 'tax_id',
+}
 
 
 class SaleOrder(models.Model):
@@ -31,7 +45,7 @@ class SaleOrder(models.Model):
         string='Pago de contado',
         currency_field='currency_id',
         compute='_compute_credit_split',
-        store=False,
+        store=True,
         readonly=True
     )
 
@@ -39,25 +53,122 @@ class SaleOrder(models.Model):
         string='Total de la orden',
         currency_field='currency_id',
         compute='_compute_credit_split',
-        store=False,
+        store=True,
         readonly=True
     )
 
-    # Mostrar el límite de crédito del cliente
+    data_partner_credit_currency_id = fields.Many2one(
+        related='partner_id.data_credit_currency_id',
+        string='Moneda del crédito (cliente)',
+    )
+
+    # Mostrar el límite de crédito del cliente, convertido a la moneda de la orden
     data_partner_credit_limit_amount = fields.Monetary(
         string='Límite de crédito (cliente)',
         currency_field='currency_id',
         compute='_compute_partner_credit_info',
-        store=False,
+        store=True,
         readonly=True
     )
 
-    @api.depends('partner_id')
+    # Crédito del cliente que esta orden puede usar: disponible más lo que ella misma ya compromete
+    data_partner_credit_available = fields.Monetary(
+        string='Crédito disponible (cliente)',
+        currency_field='currency_id',
+        compute='_compute_partner_credit_available',
+    )
+
+    # Crédito contabilizado actualmente en res.partner.data_credit_exposure por esta orden,
+    # en la moneda del límite de crédito del cliente
+    data_credit_exposure_amount = fields.Monetary(
+        string='Crédito comprometido',
+        currency_field='data_partner_credit_currency_id',
+        readonly=True,
+        copy=False,
+        default=0.0,
+    )
+
+    def _auto_init(self):
+        # Las columnas calculadas almacenadas se crean y llenan por SQL al instalar,
+        # para no recalcular con el ORM cada orden existente en tablas grandes.
+        cr = self.env.cr
+        if not column_exists(cr, 'sale_order', 'data_debit_amount'):
+            create_column(cr, 'sale_order', 'data_total_order_amount', 'numeric')
+            create_column(cr, 'sale_order', 'data_debit_amount', 'numeric')
+            if column_exists(cr, 'sale_order', 'data_credit_amount'):
+                cr.execute("""
+                    UPDATE sale_order
+                       SET data_total_order_amount = amount_total,
+                           data_debit_amount = amount_total - CASE
+                               WHEN data_is_credit_sale
+                               THEN GREATEST(0.0, LEAST(COALESCE(data_credit_amount, 0.0), amount_total))
+                               ELSE 0.0
+                           END
+                """)
+            else:
+                cr.execute("UPDATE sale_order SET data_total_order_amount = amount_total, data_debit_amount = amount_total")
+        to_convert = []
+        if not column_exists(cr, 'sale_order', 'data_partner_credit_limit_amount'):
+            create_column(cr, 'sale_order', 'data_partner_credit_limit_amount', 'numeric')
+            if column_exists(cr, 'res_partner', 'data_credit_limit_raw') \
+                    and column_exists(cr, 'res_partner', 'data_credit_currency_id'):
+                # Sin conversión solo cuando la orden está en la moneda de crédito del cliente;
+                # las demás se recalculan con el ORM (con la tasa de su fecha) al terminar
+                cr.execute("""
+                    UPDATE sale_order so
+                       SET data_partner_credit_limit_amount = rp.data_credit_limit_raw
+                      FROM res_partner rp
+                     WHERE rp.id = so.partner_id
+                       AND rp.data_credit_approved
+                       AND (rp.data_credit_currency_id IS NULL OR rp.data_credit_currency_id = so.currency_id)
+                """)
+                cr.execute("""
+                    SELECT so.id
+                      FROM sale_order so
+                      JOIN res_partner rp ON rp.id = so.partner_id
+                     WHERE rp.data_credit_approved
+                       AND rp.data_credit_currency_id != so.currency_id
+                """)
+                to_convert = [row[0] for row in cr.fetchall()]
+        res = super()._auto_init()
+        if to_convert:
+            self.env.add_to_compute(self._fields['data_partner_credit_limit_amount'], self.browse(to_convert))
+        return res
+
+    @api.depends('partner_id', 'partner_id.data_credit_approved', 'partner_id.data_credit_limit_raw',
+                 'partner_id.data_credit_currency_id', 'currency_id', 'date_order')
     def _compute_partner_credit_info(self):
-        """El límite del cliente siempre está en la moneda de la compañía."""
+        """El límite del cliente está en su moneda de crédito; se muestra en la de la orden."""
         for order in self:
             partner_limit = order.partner_id.data_credit_limit or 0.0
-            order.data_partner_credit_limit_amount = partner_limit
+            order.data_partner_credit_limit_amount = order._wholesale_from_credit_currency(partner_limit)
+
+    @api.depends('partner_id', 'data_credit_exposure_amount', 'currency_id', 'date_order')
+    def _compute_partner_credit_available(self):
+        # Una sola lectura (en caché) para todos los clientes del lote
+        credit = self.partner_id._wholesale_available_credit()
+        for order in self:
+            available = credit.get(order.partner_id.id, {}).get('available', 0.0)
+            order.data_partner_credit_available = order._wholesale_from_credit_currency(
+                available + order.data_credit_exposure_amount)
+
+    # ------------------------- Conversión de moneda ------------------------------------
+    # La tasa es la del día de la orden, de modo que el crédito comprometido al confirmar
+    # y el liberado después se convierten igual. Las tasas se leen de la tabla diaria en
+    # caché de wholesale.registry: una consulta por compañía y día, no por orden.
+    def _wholesale_to_credit_currency(self, amount):
+        """Convierte ``amount`` de la moneda de la orden a la del crédito del cliente."""
+        self.ensure_one()
+        return self.env['wholesale.registry']._convert(
+            amount, self.currency_id, self.partner_id.data_credit_currency_id,
+            self.company_id or self.env.company, self.date_order)
+
+    def _wholesale_from_credit_currency(self, amount):
+        """Convierte ``amount`` de la moneda del crédito del cliente a la de la orden."""
+        self.ensure_one()
+        return self.env['wholesale.registry']._convert(
+            amount, self.partner_id.data_credit_currency_id, self.currency_id,
+            self.company_id or self.env.company, self.date_order)
 
     @api.depends('amount_total', 'data_credit_amount', 'data_is_credit_sale')
     def _compute_credit_split(self):
@@ -80,6 +191,11 @@ class SaleOrder(models.Model):
                     order.data_credit_amount = 0.0
                 if order.amount_total and order.data_credit_amount > order.amount_total:
                     order.data_credit_amount = order.amount_total
+                if order.partner_id and order.data_credit_amount > order.data_partner_credit_available + 1e-6:
+                    return {'warning': {
+                        'title': "Crédito insuficiente",
+                        'message': f"El cliente solo tiene {order.data_partner_credit_available} de crédito disponible.",
+                    }}
 
     @api.constrains('data_credit_amount', 'data_is_credit_sale')
     def _check_credit_amount_not_over_total(self):
@@ -95,8 +211,103 @@ class SaleOrder(models.Model):
                 raise ValidationError("El pago con crédito no puede ser negativo.")
 
 
+            # Límite y crédito comprometido están en la moneda del crédito del cliente
+            credit_amount = order._wholesale_to_credit_currency(order.data_credit_amount)
             partner_limit = order.partner_id.data_credit_limit or 0.0
-            if order.data_credit_amount > partner_limit:
+            if credit_amount > partner_limit + 1e-6:
                 raise ValidationError(
                     f"El pago con crédito no puede superar el límite del cliente ({partner_limit})."
                 )
+
+            # Crédito comprometido en otras órdenes abiertas del cliente (sin contar esta)
+            other_exposure = order.partner_id.data_credit_exposure - order.data_credit_exposure_amount
+            available = partner_limit - other_exposure
+            if credit_amount > available + 1e-6:
+                raise ValidationError(
+                    f"El pago con crédito no puede superar el crédito disponible del cliente ({available})."
+                )
+
+    # ------------------------- Crédito comprometido por cliente ------------------------
+    def write(self, vals):
+        if 'partner_id' in vals:
+            # El crédito ya comprometido pertenece al cliente anterior: se libera antes de cambiarlo
+            self._wholesale_release_credit_exposure()
+        res = super().write(vals)
+        if CREDIT_EXPOSURE_TRIGGER_FIELDS.intersection(vals):
+            self._wholesale_sync_credit_exposure()
+        return res
+
+    def _wholesale_release_credit_exposure(self):
+        """Descuenta del cliente actual el crédito comprometido por estas órdenes y lo deja en cero;
+        el siguiente ``_wholesale_sync_credit_exposure`` lo vuelve a contabilizar."""
+        orders = self.filtered('data_credit_exposure_amount')
+        if not orders:
+            return
+        partner_deltas = {}
+        for order in orders:
+            partner_deltas[order.partner_id.id] = \
+                partner_deltas.get(order.partner_id.id, 0.0) - order.data_credit_exposure_amount
+        self.env['res.partner']._wholesale_apply_credit_exposure(partner_deltas)
+        self.env.cr.execute(
+            "UPDATE sale_order SET data_credit_exposure_amount = 0.0 WHERE id IN %s", [tuple(orders.ids)])
+        self.invalidate_model(['data_credit_exposure_amount'])
+
+    def _wholesale_credit_exposure_target(self):
+        """Crédito que la orden debe tener comprometido según su estado actual,
+        en la moneda del crédito del cliente."""
+        self.ensure_one()
+        if (self.data_is_wholesale_sale and self.data_is_credit_sale
+                and self.state in ('sale', 'done')
+                and self.data_finance_approval_status in CREDIT_EXPOSURE_STATUSES):
+            return self._wholesale_to_credit_currency(self.data_total_order_amount - self.data_debit_amount)
+        return 0.0
+
+    def _wholesale_sync_credit_exposure(self):
+        """Ajusta de forma incremental el crédito comprometido de los clientes de estas órdenes.
+
+        Solo se aplican las diferencias contra ``data_credit_exposure_amount``,
+        por lo que llamarlo varias veces sobre las mismas órdenes no duplica montos.
+        """
+        partner_deltas = {}
+        order_targets = {}
+        for order in self:
+            target = order._wholesale_credit_exposure_target()
+            delta = target - order.data_credit_exposure_amount
+            if float_is_zero(delta, precision_rounding=order.partner_id.data_credit_currency_id.rounding or 0.01):
+                continue
+            partner_deltas[order.partner_id.id] = partner_deltas.get(order.partner_id.id, 0.0) + delta
+            order_targets[order.id] = target
+        if not order_targets:
+            return
+
+        self.env['res.partner']._wholesale_apply_credit_exposure(partner_deltas)
+        self.env.cr.execute("""
+            UPDATE sale_order so
+               SET data_credit_exposure_amount = t.amount
+              FROM unnest(%s::int[], %s::numeric[]) AS t(order_id, amount)
+             WHERE so.id = t.order_id
+        """, [list(order_targets), list(order_targets.values())])
+        self.invalidate_model(['data_credit_exposure_amount'])
+
+
+class SaleOrderLine(models.Model):
+    _inherit = 'sale.order.line'
+
+    # Las líneas también se editan sin pasar por sale.order.write
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super().create(vals_list)
+        lines.order_id._wholesale_sync_credit_exposure()
+        return lines
+
+    def write(self, vals):
+        res = super().write(vals)
+        if CREDIT_EXPOSURE_LINE_TRIGGER_FIELDS.intersection(vals):
+            self.order_id._wholesale_sync_credit_exposure()
+        return res
+
+    def unlink(self):
+        orders = self.order_id
+        res = super().unlink()
+        orders.exists()._wholesale_sync_credit_exposure()
+        return res
\ No newline at end of file
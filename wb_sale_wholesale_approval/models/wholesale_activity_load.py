@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+
+
+class WholesaleActivityLoad(models.Model):
+    """Bitácora de cambios en la carga de actividades abiertas por usuario.
+
+    Cada alta, cierre o reasignación de una actividad en órdenes de venta solo
+    inserta renglones ``(usuario, delta)``; la carga es la suma de los deltas.
+    Como nunca se actualiza un renglón existente, las transacciones que
+    asignan o cierran actividades del mismo usuario no se bloquean entre sí.
+    El cron de compactación reduce la bitácora a un renglón por usuario.
+    """
+    _name = 'wholesale.activity.load'
+    _description = 'Carga de actividades por usuario (mayoreo)'
+    _log_access = False
+
+    user_id = fields.Many2one('res.users', string='Usuario', required=True, ondelete='cascade', index=True)
+    delta = fields.Integer(string='Cambio', required=True)
+
+    @api.model
+    def _add(self, deltas):
+        """Registra en una sola inserción los cambios ``{user_id: delta}``."""
+        deltas = {user_id: delta for user_id, delta in deltas.items() if user_id and delta}
+        if not deltas:
+            return
+        self.env.cr.execute("""
+            INSERT INTO wholesale_activity_load (user_id, delta)
+            SELECT * FROM unnest(%s::int[], %s::int[])
+        """, [list(deltas), list(deltas.values())])
+
+    @api.model
+    def _get_loads(self, user_ids):
+        """``{user_id: carga}`` de los usuarios activos de ``user_ids``; los que
+        ya no existen o están archivados no aparecen."""
+        if not user_ids:
+            return {}
+        self.env.cr.execute("""
+            SELECT u.id, GREATEST(COALESCE(SUM(l.delta), 0), 0)
+              FROM res_users u
+              LEFT JOIN wholesale_activity_load l ON l.user_id = u.id
+             WHERE u.id IN %s
+               AND u.active
+          GROUP BY u.id
+        """, [tuple(user_ids)])
+        return dict(self.env.cr.fetchall())
+
+    @api.model
+    def _cron_compact(self):
+        """Reduce la bitácora a un renglón por usuario. Solo se borran los renglones
+        visibles para esta transacción; los que se inserten en paralelo se conservan."""
+        self.env.cr.execute("""
+            WITH gone AS (
+                DELETE FROM wholesale_activity_load RETURNING user_id, delta
+            )
+            INSERT INTO wholesale_activity_load (user_id, delta)
+            SELECT user_id, SUM(delta) FROM gone GROUP BY user_id HAVING SUM(delta) <> 0
+        """)
+
+    @api.model
+    def _recompute(self):
+        """Reconstruye la bitácora a partir de las actividades abiertas en órdenes de venta.
+        Se usa al instalar o actualizar el módulo, o para corregir desviaciones."""
+        self.env['mail.activity'].flush_model(['res_model', 'user_id'])
+        self.env.cr.execute("DELETE FROM wholesale_activity_load")
+        self.env.cr.execute("""
+            INSERT INTO wholesale_activity_load (user_id, delta)
+            SELECT user_id, COUNT(*)
+              FROM mail_activity
+             WHERE res_model = 'sale.order'
+               AND user_id IS NOT NULL
+          GROUP BY user_id
+        """)
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+from odoo.tools.sql import create_index
+
+from .sale_order import FINANCE_APPROVAL_STATUSES
+
+
+class WholesaleFinanceTransition(models.Model):
+    """Bitácora de solo inserción de los cambios de estado financiero.
+
+    Cada cambio de ``data_finance_approval_status`` genera una línea con el
+    tiempo que la orden permaneció en el estado anterior, de modo que los
+    reportes de SLA se resuelven con un ``read_group`` sobre esta tabla.
+    """
+    _name = 'wholesale.finance.transition'
+    _description = 'Cambio de estado financiero (mayoreo)'
+    _order = 'transition_date desc, id desc'
+    _log_access = False
+
+    order_id = fields.Many2one('sale.order', string='Orden de venta', required=True, ondelete='cascade', index=True, readonly=True)
+    from_status = fields.Selection(FINANCE_APPROVAL_STATUSES, string='Estado anterior', readonly=True)
+    to_status = fields.Selection(FINANCE_APPROVAL_STATUSES, string='Estado nuevo', readonly=True)
+    user_id = fields.Many2one('res.users', string='Usuario', readonly=True)
+    transition_date = fields.Datetime(string='Fecha', required=True, readonly=True)
+    duration_hours = fields.Float(string='Horas en estado anterior', group_operator='avg', readonly=True)
+
+    # Copias de la orden al momento del cambio, para agrupar sin unir con sale_order
+    salesperson_id = fields.Many2one('res.users', string='Vendedor', readonly=True)
+    company_id = fields.Many2one('res.company', string='Compañía', readonly=True)
+
+    def init(self):
+        super().init()
+        create_index(
+            self.env.cr, 'wholesale_finance_transition_from_status_date_idx', self._table,
+            ['from_status', 'transition_date'],
+        )
+        create_index(
+            self.env.cr, 'wholesale_finance_transition_to_status_date_idx', self._table,
+            ['to_status', 'transition_date'],
+        )
+
+    def write(self, vals):
+        raise UserError(_("La bitácora de estados financieros no se puede modificar."))
+
+    def unlink(self):
+        if not self.env.su:
+            raise UserError(_("La bitácora de estados financieros no se puede eliminar."))
+        return super().unlink()
+
+    @api.model
+    def _log_transitions(self, previous, to_status, date):
+        """Registra con un solo ``create`` los cambios a ``to_status``.
+
+        ``previous`` es una lista de ``(orden, estado_anterior, fecha_estado_anterior)``.
+        """
+        vals_list = []
+        for order, from_status, since in previous:
+            duration = (date - since).total_seconds() / 3600.0 if since else 0.0
+            vals_list.append({
+                'order_id': order.id,
+                'from_status': from_status,
+                'to_status': to_status,
+                'user_id': self.env.uid,
+                'transition_date': date,
+                'duration_hours': duration,
+                'salesperson_id': order.user_id.id,
+                'company_id': order.company_id.id,
+            })
+        return self.sudo().create(vals_list)
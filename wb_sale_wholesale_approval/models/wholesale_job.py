@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+import logging
+import time
+import traceback
+from datetime import timedelta
+
+from odoo import models, fields, api
+from odoo.tools.sql import create_index
+
+_logger = logging.getLogger(__name__)
+
+# Parámetros del trabajador de la cola
+JOB_BATCH_SIZE = 100
+JOB_TIME_BUDGET = 240  # segundos por ejecución
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BASE_MINUTES = 2  # espera exponencial: 2, 4, 8, ... minutos
+
+# Solo se ejecutan métodos con este prefijo desde la cola
+JOB_METHOD_PREFIX = '_wholesale_job_'
+
+
+class WholesaleJob(models.Model):
+    """Trabajo diferido del flujo de ventas al mayoreo.
+
+    Cada trabajo llama a un método ``_wholesale_job_*`` sobre un registro. La
+    llave de idempotencia evita encolar dos veces el mismo trabajo, y los
+    métodos de trabajo deben poder ejecutarse más de una vez sin efectos
+    duplicados. El cron ``ir_cron_run_wholesale_jobs`` vacía la cola.
+    """
+    _name = 'wholesale.job'
+    _description = 'Trabajo diferido (mayoreo)'
+    _order = 'eta, id'
+
+    name = fields.Char(string='Llave de idempotencia', required=True, readonly=True)
+    res_model = fields.Char(string='Modelo', required=True, readonly=True)
+    res_id = fields.Integer(string='ID del registro', required=True, readonly=True)
+    method_name = fields.Char(string='Método', required=True, readonly=True)
+    state = fields.Selection([
+        ('pending', 'Pendiente'),
+        ('done', 'Hecho'),
+        ('failed', 'Fallido'),
+    ], string='Estado', default='pending', required=True, readonly=True)
+    eta = fields.Datetime(string='Ejecutar a partir de', default=fields.Datetime.now, required=True, readonly=True)
+    attempts = fields.Integer(string='Intentos', readonly=True)
+    max_attempts = fields.Integer(string='Máximo de intentos', default=JOB_MAX_ATTEMPTS, readonly=True)
+    date_done = fields.Datetime(string='Fecha de ejecución', readonly=True)
+    last_error = fields.Text(string='Último error', readonly=True)
+
+    _sql_constraints = [
+        ('name_uniq', 'unique(name)', 'Ya existe un trabajo con esta llave de idempotencia.'),
+    ]
+
+    def init(self):
+        # El trabajador solo consulta los trabajos pendientes
+        create_index(
+            self.env.cr, 'wholesale_job_pending_eta_idx', self._table,
+            ['eta', 'id'], where="state = 'pending'",
+        )
+
+    # ---------------------------------------------------------------------------------
+    # Encolar
+    @api.model
+    def _enqueue(self, records, method_name, key_fn):
+        """Encola ``method_name`` para cada registro de ``records``.
+
+        ``key_fn(record)`` devuelve la llave de idempotencia; los registros cuya
+        llave ya está en la cola se omiten. Devuelve los trabajos creados.
+
+        La inserción usa ``ON CONFLICT DO NOTHING``: si otra transacción encola la
+        misma llave al mismo tiempo, esta espera a que termine y la omite en lugar
+        de fallar con un error de integridad dentro de la confirmación del usuario.
+        """
+        assert method_name.startswith(JOB_METHOD_PREFIX), method_name
+        if not records:
+            return self.browse()
+        keys = {key_fn(record): record for record in records}
+        now = fields.Datetime.now()
+        self.env.cr.execute("""
+            INSERT INTO wholesale_job (name, res_model, res_id, method_name, state, eta, attempts, max_attempts,
+                                       create_uid, create_date, write_uid, write_date)
+            SELECT k.name, %s, k.res_id, %s, 'pending', %s, 0, %s, %s, %s, %s, %s
+              FROM unnest(%s::varchar[], %s::int[]) AS k(name, res_id)
+                ON CONFLICT (name) DO NOTHING
+         RETURNING id
+        """, [
+            records._name, method_name, now, JOB_MAX_ATTEMPTS, self.env.uid, now, self.env.uid, now,
+            list(keys), [record.id for record in keys.values()],
+        ])
+        jobs = self.browse(sorted(row[0] for row in self.env.cr.fetchall()))
+        if jobs:
+            self.env['wholesale.registry']._ref('wb_sale_wholesale_approval.ir_cron_run_wholesale_jobs')._trigger()
+        return jobs
+
+    # ---------------------------------------------------------------------------------
+    # Trabajador
+    @api.model
+    def _cron_run_jobs(self, batch_size=JOB_BATCH_SIZE, time_budget=JOB_TIME_BUDGET):
+        """
+        Ejecuta los trabajos pendientes en lotes. Cada lote se bloquea con
+        ``FOR UPDATE SKIP LOCKED``, de modo que varios trabajadores pueden
+        correr a la vez sin tomar el mismo trabajo, y se confirma al terminar.
+        """
+        start = time.monotonic()
+        stats = {'done': 0, 'retried': 0, 'failed': 0}
+        while True:
+            self.env.cr.execute("""
+                SELECT id FROM wholesale_job
+                 WHERE state = 'pending' AND eta <= (now() AT TIME ZONE 'UTC')
+                 ORDER BY eta, id
+                 LIMIT %s
+                   FOR UPDATE SKIP LOCKED
+            """, [batch_size])
+            job_ids = [row[0] for row in self.env.cr.fetchall()]
+            if not job_ids:
+                break
+
+            for key, value in self.sudo().browse(job_ids)._run().items():
+                stats[key] += value
+            self.env['sale.order']._wholesale_commit()
+
+            if len(job_ids) < batch_size:
+                break
+            if time.monotonic() - start >= time_budget:
+                self.env['wholesale.registry']._ref('wb_sale_wholesale_approval.ir_cron_run_wholesale_jobs')._trigger()
+                break
+
+        if any(stats.values()):
+            _logger.info(
+                "Cola de mayoreo: %(done)d trabajos hechos, %(retried)d reintentos, %(failed)d fallidos.", stats)
+        return stats
+
+    def _run(self):
+        """Ejecuta los trabajos agrupados por modelo y método, con una llamada por grupo.
+        Si un grupo falla se reintenta trabajo por trabajo para aislar el error."""
+        stats = {'done': 0, 'retried': 0, 'failed': 0}
+        groups = {}
+        for job in self:
+            groups.setdefault((job.res_model, job.method_name), self.browse())
+            groups[(job.res_model, job.method_name)] |= job
+
+        for (res_model, method_name), jobs in groups.items():
+            try:
+                with self.env.cr.savepoint():
+                    jobs._call(res_model, method_name)
+                jobs._mark_done()
+                stats['done'] += len(jobs)
+                continue
+            except Exception:
+                self.env.invalidate_all()
+                if len(jobs) == 1:
+                    jobs._mark_failed(traceback.format_exc())
+                    stats['retried' if jobs.state == 'pending' else 'failed'] += 1
+                    continue
+            for job in jobs:
+                try:
+                    with self.env.cr.savepoint():
+                        job._call(res_model, method_name)
+                    job._mark_done()
+                    stats['done'] += 1
+                except Exception:
+                    self.env.invalidate_all()
+                    job._mark_failed(traceback.format_exc())
+                    stats['retried' if job.state == 'pending' else 'failed'] += 1
+        return stats
+
+    def _call(self, res_model, method_name):
+        if not method_name.startswith(JOB_METHOD_PREFIX):
+            raise ValueError("Método no permitido en la cola de mayoreo: %s" % method_name)
+        records = self.env[res_model].browse(self.mapped('res_id')).exists()
+        if records:
+            getattr(records, method_name)()
+
+    def _mark_done(self):
+        self.write({'state': 'done', 'date_done': fields.Datetime.now(), 'last_error': False})
+
+    def _mark_failed(self, error):
+        """Cuenta el intento fallido y programa el reintento con espera exponencial."""
+        self.ensure_one()
+        attempts = self.attempts + 1
+        _logger.warning("Falló el trabajo de mayoreo %s (intento %d de %d).", self.name, attempts, self.max_attempts)
+        if attempts >= self.max_attempts:
+            self.write({'state': 'failed', 'attempts': attempts, 'last_error': error})
+        else:
+            self.write({
+                'attempts': attempts,
+                'last_error': error,
+                'eta': fields.Datetime.now() + timedelta(minutes=JOB_RETRY_BASE_MINUTES ** attempts),
+            })
+
+    def action_requeue(self):
+        """Devuelve a la cola los trabajos fallidos."""
+        self.filtered(lambda j: j.state == 'failed').write({
+            'state': 'pending', 'attempts': 0, 'eta': fields.Datetime.now(),
+        })
+        self.env['wholesale.registry']._ref('wb_sale_wholesale_approval.ir_cron_run_wholesale_jobs')._trigger()
+
+    @api.model
+    def _cron_gc_jobs(self, days=7):
+        """Elimina los trabajos hechos más antiguos que ``days`` días."""
+        self.env.cr.execute(
+            "DELETE FROM wholesale_job WHERE state = 'done' AND date_done < %s",
+            [fields.Datetime.now() - timedelta(days=days)])
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields
+
+
+class WholesalePaymentReminder(models.Model):
+    """Bitácora de avisos de pago enviados a órdenes al mayoreo.
+
+    Se registra una línea por orden y día de aviso, de modo que el cron
+    no vuelva a avisar a la misma orden dentro del intervalo configurado.
+    """
+    _name = 'wholesale.payment.reminder'
+    _description = 'Aviso de pago pendiente (mayoreo)'
+    _order = 'reminder_date desc, id desc'
+
+    order_id = fields.Many2one('sale.order', string='Orden de venta', required=True, ondelete='cascade', index=True)
+    reminder_date = fields.Date(string='Fecha de aviso', required=True, default=fields.Date.context_today, index=True)
+
+    _sql_constraints = [
+        ('order_date_uniq', 'unique(order_id, reminder_date)',
+         'Solo se permite un aviso de pago por orden y día.'),
+    ]
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+import functools
+import heapq
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from odoo import models, fields, api
+from odoo.tools.profiler import Profiler
+
+_logger = logging.getLogger(__name__)
+
+PERF_SAMPLING_PARAM = 'wb_sale_wholesale_approval.perf_sampling'
+PERF_PROFILER_PARAM = 'wb_sale_wholesale_approval.perf_profile_next_run'
+PERF_RETENTION_PARAM = 'wb_sale_wholesale_approval.perf_retention_days'
+PERF_RETENTION_DAYS = 14
+PERF_SLOW_QUERIES = 5
+
+_profiling = threading.local()
+
+
+def records_in_self(records, result):
+    """Registros tocados por un método de recordset: los del propio recordset."""
+    return len(records)
+
+
+def wholesale_profiled(record_count):
+    """Mide la llamada y guarda una muestra en ``wholesale.perf.sample``.
+
+    ``record_count(self, result)`` devuelve los registros que tocó la llamada; cada
+    método lo declara (``records_in_self`` para botones, el conteo del resultado
+    para crons y métodos ``@api.model``).
+
+    Solo actúa si el muestreo está activo (``PERF_SAMPLING_PARAM``) o si se pidió
+    perfilar la siguiente ejecución (``PERF_PROFILER_PARAM``, que se apaga al usarse).
+    Las llamadas anidadas a otros métodos instrumentados se cuentan en la externa.
+    """
+    return functools.partial(_wholesale_profiled, record_count=record_count)
+
+
+def _wholesale_profiled(method, record_count):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if getattr(_profiling, 'active', False):
+            return method(self, *args, **kwargs)
+        params = self.env['ir.config_parameter'].sudo()
+        sampling = params.get_param(PERF_SAMPLING_PARAM)
+        profile_run = params.get_param(PERF_PROFILER_PARAM)
+        if not sampling and not profile_run:
+            return method(self, *args, **kwargs)
+
+        name = '%s.%s' % (self._name, method.__name__)
+        if profile_run:
+            params.set_param(PERF_PROFILER_PARAM, False)
+
+        queries = []
+        stats = {'count': 0, 'time': 0.0}
+
+        def query_hook(cr, query, query_params, start, delay):
+            stats['count'] += 1
+            stats['time'] += delay
+            entry = (delay, stats['count'], query, query_params)
+            if len(queries) < PERF_SLOW_QUERIES:
+                heapq.heappush(queries, entry)
+            elif delay > queries[0][0]:
+                heapq.heapreplace(queries, entry)
+
+        thread = threading.current_thread()
+        hooks = getattr(thread, 'query_hooks', None)
+        if hooks is None:
+            hooks = thread.query_hooks = []
+        hooks.append(query_hook)
+        _profiling.active = True
+        start = time.perf_counter()
+        try:
+            if profile_run:
+                with Profiler(db=self.env.cr.dbname, description=name, collectors=['sql', 'traces_async']):
+                    result = method(self, *args, **kwargs)
+            else:
+                result = method(self, *args, **kwargs)
+        finally:
+            duration = time.perf_counter() - start
+            _profiling.active = False
+            hooks.remove(query_hook)
+
+        self.env['wholesale.perf.sample'].sudo().create({
+            'name': name,
+            'duration_ms': duration * 1000.0,
+            'query_count': stats['count'],
+            'query_time_ms': stats['time'] * 1000.0,
+            'record_count': record_count(self, result),
+            'slow_queries': '\n\n'.join(
+                '%.1f ms\n%s' % (delay * 1000.0, self.env.cr.mogrify(query, query_params).decode(errors='replace'))
+                for delay, _seq, query, query_params in sorted(queries, reverse=True)
+            ),
+            'profiled': bool(profile_run),
+        })
+        return result
+    return wrapper
+
+
+class WholesalePerfSample(models.Model):
+    """Muestra de rendimiento de una acción o cron de ventas al mayoreo."""
+    _name = 'wholesale.perf.sample'
+    _description = 'Muestra de rendimiento (mayoreo)'
+    _order = 'create_date desc, id desc'
+
+    name = fields.Char(string='Método', required=True, readonly=True, index=True)
+    duration_ms = fields.Float(string='Duración (ms)', readonly=True, group_operator='avg')
+    query_count = fields.Integer(string='Consultas SQL', readonly=True, group_operator='avg')
+    query_time_ms = fields.Float(string='Tiempo SQL (ms)', readonly=True, group_operator='avg')
+    record_count = fields.Integer(string='Registros', readonly=True)
+    slow_queries = fields.Text(string='Consultas más lentas', readonly=True)
+    profiled = fields.Boolean(string='Con perfilador', readonly=True,
+                              help='La ejecución se perfiló con odoo.tools.profiler (ver Perfiles en Técnico).')
+
+    @api.model
+    def _cron_gc_samples(self):
+        """Elimina las muestras más antiguas que el periodo de retención."""
+        days = int(self.env['ir.config_parameter'].sudo().get_param(PERF_RETENTION_PARAM, PERF_RETENTION_DAYS))
+        limit_date = fields.Datetime.now() - timedelta(days=days)
+        self.env.cr.execute("DELETE FROM wholesale_perf_sample WHERE create_date < %s", [limit_date])
+        _logger.info("Se eliminaron %d muestras de rendimiento de mayoreo.", self.env.cr.rowcount)
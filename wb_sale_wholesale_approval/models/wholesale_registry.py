@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api, tools
+
+WHOLESALE_TEAM_NAME = 'Team_Mayoreo'
+WHOLESALE_WAREHOUSE_NAME = 'Almacen General'
+
+
+class WholesaleRegistry(models.AbstractModel):
+    """Resolución en caché (ormcache) de los registros que usa el flujo de mayoreo.
+
+    XML-IDs, miembros de grupos, equipo de ventas y almacén de mayoreo se
+    resuelven una sola vez por proceso; la caché se limpia cuando cambian
+    los registros de los que depende (ver los ``_inherit`` que llaman a
+    ``clear_caches``).
+    """
+    _name = 'wholesale.registry'
+    _description = 'Registro en caché de ventas al mayoreo'
+
+    @api.model
+    @tools.ormcache('xmlid')
+    def _get_ref(self, xmlid):
+        """Devuelve ``(modelo, id)`` del XML-ID, o ``(False, False)`` si no existe."""
+        try:
+            return self.env['ir.model.data']._xmlid_to_res_model_res_id(xmlid, raise_if_not_found=True)
+        except ValueError:
+            return False, False
+
+    @api.model
+    def _ref(self, xmlid):
+        """Equivalente a ``env.ref`` sin la consulta de existencia en cada llamada."""
+        model, res_id = self._get_ref(xmlid)
+        if not model:
+            raise ValueError('External ID not found in the system: %s' % xmlid)
+        return self.env[model].browse(res_id)
+
+    @api.model
+    def _get_ref_id(self, xmlid):
+        return self._get_ref(xmlid)[1]
+
+    @api.model
+    @tools.ormcache('group_xmlid')
+    def _get_group_user_ids(self, group_xmlid):
+        """Ids de los usuarios activos del grupo, en el orden por defecto de ``res.users``."""
+        group_id = self._get_ref_id(group_xmlid)
+        if not group_id:
+            return ()
+        return tuple(self.env['res.users'].sudo().search([('groups_id', 'in', group_id)]).ids)
+
+    @api.model
+    @tools.ormcache('key', 'default')
+    def _get_param(self, key, default=False):
+        """Parámetro de sistema en caché; ``set_param`` limpia esta caché."""
+        return self.env['ir.config_parameter'].sudo().get_param(key, default)
+
+    @api.model
+    @tools.ormcache('key', 'default')
+    def _get_int_param(self, key, default):
+        """Parámetro de sistema entero; ``set_param`` limpia esta caché."""
+        try:
+            return int(self.env['ir.config_parameter'].sudo().get_param(key, default))
+        except (TypeError, ValueError):
+            return default
+
+    @api.model
+    @tools.ormcache('company_id')
+    def _get_wholesale_team_id(self, company_id):
+        company = self.env['res.company'].sudo().browse(company_id)
+        team = company.data_wholesale_team_id
+        if not team:
+            # Compatibilidad: si no está configurado, se busca por nombre
+            team = self.env['crm.team'].sudo().search([('name', '=', WHOLESALE_TEAM_NAME)], limit=1)
+        return team.id
+
+    @api.model
+    @tools.ormcache('company_id')
+    def _get_wholesale_warehouse_id(self, company_id):
+        company = self.env['res.company'].sudo().browse(company_id)
+        warehouse = company.data_wholesale_warehouse_id
+        if not warehouse:
+            # Compatibilidad: si no está configurado, se busca por nombre
+            warehouse = self.env['stock.warehouse'].sudo().search([('name', '=', WHOLESALE_WAREHOUSE_NAME)], limit=1)
+        return warehouse.id
+
+    @api.model
+    @tools.ormcache('company_id', 'date')
+    def _get_currency_rates(self, company_id, date):
+        """Tabla ``{currency_id: tasa}`` de las monedas activas para la compañía y el día,
+        llenada con una sola consulta; se limpia al cambiar las tasas (ver ``ResCurrencyRate``)."""
+        company = self.env['res.company'].sudo().browse(company_id)
+        return self.env['res.currency'].sudo().search([])._get_rates(company, date)
+
+    @api.model
+    def _get_conversion_rate(self, from_currency, to_currency, company, date):
+        """Tasa para convertir de ``from_currency`` a ``to_currency``, como
+        ``res.currency._get_conversion_rate`` pero leyendo la tabla diaria en caché."""
+        if from_currency == to_currency:
+            return 1.0
+        date = fields.Date.to_date(date) or fields.Date.context_today(self)
+        rates = self._get_currency_rates(company.id, date)
+        if from_currency.id not in rates or to_currency.id not in rates:
+            # Moneda archivada: fuera de la tabla, se consulta directamente
+            return self.env['res.currency']._get_conversion_rate(from_currency, to_currency, company, date)
+        return rates[to_currency.id] / rates[from_currency.id]
+
+    @api.model
+    def _convert(self, amount, from_currency, to_currency, company, date):
+        """Equivalente a ``res.currency._convert`` (con redondeo) usando la tabla en caché."""
+        if not amount or from_currency == to_currency or not from_currency or not to_currency:
+            return amount
+        return to_currency.round(amount * self._get_conversion_rate(from_currency, to_currency, company, date))
+
+
+# --------------------------------------------------------------------------------
+# Invalidación de la caché cuando cambian los registros resueltos
+class CrmTeam(models.Model):
+    _inherit = 'crm.team'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self.env['wholesale.registry'].clear_caches()
+        return super().create(vals_list)
+
+    def write(self, vals):
+        if 'name' in vals or 'active' in vals:
+            self.env['wholesale.registry'].clear_caches()
+        return super().write(vals)
+
+    def unlink(self):
+        self.env['wholesale.registry'].clear_caches()
+        return super().unlink()
+
+
+class StockWarehouse(models.Model):
+    _inherit = 'stock.warehouse'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self.env['wholesale.registry'].clear_caches()
+        return super().create(vals_list)
+
+    def write(self, vals):
+        if 'name' in vals or 'active' in vals:
+            self.env['wholesale.registry'].clear_caches()
+        return super().write(vals)
+
+    def unlink(self):
+        self.env['wholesale.registry'].clear_caches()
+        return super().unlink()
+
+
+class ResGroups(models.Model):
+    _inherit = 'res.groups'
+
+    def write(self, vals):
+        if 'users' in vals or 'implied_ids' in vals:
+            self.env['wholesale.registry'].clear_caches()
+        return super().write(vals)
+
+
+class ResCurrency(models.Model):
+    _inherit = 'res.currency'
+
+    def write(self, vals):
+        if 'active' in vals:
+            self.env['wholesale.registry'].clear_caches()
+        return super().write(vals)
+
+
+class ResCurrencyRate(models.Model):
+    _inherit = 'res.currency.rate'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        self.env['wholesale.registry'].clear_caches()
+        return super().create(vals_list)
+
+    def write(self, vals):
+        self.env['wholesale.registry'].clear_caches()
+        return super().write(vals)
+
+    def unlink(self):
+        self.env['wholesale.registry'].clear_caches()
+        return super().unlink()
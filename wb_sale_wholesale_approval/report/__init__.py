@@ -0,0 +1 @@
+from . import wholesale_finance_pipeline_report
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, tools
+
+from ..models.sale_order import FINANCE_APPROVAL_STATUSES
+
+AGE_BUCKETS = [
+    ('0_1', 'Menos de 1 día'),
+    ('1_3', '1 a 3 días'),
+    ('3_6', '3 a 6 días'),
+    ('6_plus', 'Más de 6 días'),
+]
+
+
+class WholesaleFinancePipelineReport(models.Model):
+    """Pipeline financiero de ventas al mayoreo, respaldado por una vista SQL.
+
+    Montos en la moneda de la compañía; la antigüedad se calcula desde
+    ``data_confirmation_date`` al momento de la consulta.
+    """
+    _name = 'wholesale.finance.pipeline.report'
+    _description = 'Pipeline de aprobación financiera (mayoreo)'
+    _auto = False
+    _rec_name = 'order_id'
+    _order = 'confirmation_date desc'
+
+    order_id = fields.Many2one('sale.order', string='Orden de venta', readonly=True)
+    partner_id = fields.Many2one('res.partner', string='Cliente', readonly=True)
+    user_id = fields.Many2one('res.users', string='Vendedor', readonly=True)
+    team_id = fields.Many2one('crm.team', string='Equipo de ventas', readonly=True)
+    company_id = fields.Many2one('res.company', string='Compañía', readonly=True)
+    currency_id = fields.Many2one('res.currency', string='Moneda', readonly=True)
+    finance_status = fields.Selection(FINANCE_APPROVAL_STATUSES, string='Estado Financiero', readonly=True)
+    confirmation_date = fields.Datetime(string='Fecha de Confirmación SO', readonly=True)
+    age_days = fields.Float(string='Antigüedad (días)', readonly=True, group_operator='avg')
+    age_bucket = fields.Selection(AGE_BUCKETS, string='Antigüedad', readonly=True)
+    is_credit_sale = fields.Boolean(string='Venta a crédito', readonly=True)
+    nbr = fields.Integer(string='# Órdenes', readonly=True)
+    amount_total = fields.Monetary(string='Total', currency_field='currency_id', readonly=True)
+    credit_amount = fields.Monetary(string='Pago con crédito', currency_field='currency_id', readonly=True)
+    debit_amount = fields.Monetary(string='Pago de contado', currency_field='currency_id', readonly=True)
+
+    def _query(self):
+        return """
+            SELECT so.id AS id,
+                   so.id AS order_id,
+                   so.partner_id AS partner_id,
+                   so.user_id AS user_id,
+                   so.team_id AS team_id,
+                   so.company_id AS company_id,
+                   rc.currency_id AS currency_id,
+                   so.data_finance_approval_status AS finance_status,
+                   so.data_confirmation_date AS confirmation_date,
+                   age.days AS age_days,
+                   CASE
+                       WHEN age.days < 1 THEN '0_1'
+                       WHEN age.days < 3 THEN '1_3'
+                       WHEN age.days < 6 THEN '3_6'
+                       ELSE '6_plus'
+                   END AS age_bucket,
+                   so.data_is_credit_sale AS is_credit_sale,
+                   1 AS nbr,
+                   so.amount_total / COALESCE(NULLIF(so.currency_rate, 0), 1.0) AS amount_total,
+                   (COALESCE(so.data_total_order_amount, 0.0) - COALESCE(so.data_debit_amount, 0.0))
+                       / COALESCE(NULLIF(so.currency_rate, 0), 1.0) AS credit_amount,
+                   COALESCE(so.data_debit_amount, 0.0) / COALESCE(NULLIF(so.currency_rate, 0), 1.0) AS debit_amount
+              FROM sale_order so
+              JOIN res_company rc ON rc.id = so.company_id
+             CROSS JOIN LATERAL (
+                   SELECT EXTRACT(EPOCH FROM ((NOW() AT TIME ZONE 'UTC') - so.data_confirmation_date)) / 86400.0 AS days
+             ) age
+             WHERE so.data_is_wholesale_sale
+               AND so.data_finance_approval_status IS NOT NULL
+               AND so.state IN ('sale', 'done')
+        """
+
+    def init(self):
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute("CREATE OR REPLACE VIEW %s AS (%s)" % (self._table, self._query()))
@@ -0,0 +1,10 @@
+from . import test_wholesale_indexes
+from . import test_wholesale_query_count
+from . import test_wholesale_job
+from . import test_wholesale_notification
+from . import test_wholesale_ingest
+from . import test_wholesale_bank_statement
+from . import test_wholesale_credit
+from . import test_wholesale_cleanup
+from . import test_wholesale_auto_cancel
+from . import test_wholesale_activity_load
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+from odoo.tests.common import TransactionCase, new_test_user
+
+
+class WholesaleCommon(TransactionCase):
+    """Datos base para las pruebas del flujo de ventas al mayoreo."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+
+        cls.wholesale_user = new_test_user(
+            cls.env, login='wholesale_seller',
+            groups='sales_team.group_sale_salesman_all_leads,wb_sale_wholesale_approval.group_sales_wholesale_user',
+        )
+        cls.finance_users = new_test_user(
+            cls.env, login='wholesale_finance_1',
+            groups='sales_team.group_sale_salesman_all_leads,wb_sale_wholesale_approval.group_finance_user',
+        ) | new_test_user(
+            cls.env, login='wholesale_finance_2',
+            groups='sales_team.group_sale_salesman_all_leads,wb_sale_wholesale_approval.group_finance_user',
+        )
+        cls.commercial_user = new_test_user(
+            cls.env, login='wholesale_commercial',
+            groups='sales_team.group_sale_salesman_all_leads,wb_sale_wholesale_approval.group_sales_commercial_user',
+        )
+
+        cls.wholesale_team = cls.env['crm.team'].create({'name': 'Mayoreo (pruebas)'})
+        cls.env.company.data_wholesale_team_id = cls.wholesale_team
+
+        cls.partner = cls.env['res.partner'].create({
+            'name': 'Cliente Mayoreo',
+            'data_credit_approved': True,
+            'data_credit_limit_raw': 1e9,
+        })
+        # Servicio: la confirmación no genera movimientos de inventario
+        cls.product = cls.env['product.product'].create({
+            'name': 'Producto Mayoreo',
+            'type': 'service',
+            'list_price': 100.0,
+        })
+
+    @classmethod
+    def _create_wholesale_orders(cls, count, **vals):
+        return cls.env['sale.order'].create([dict({
+            'partner_id': cls.partner.id,
+            'user_id': cls.wholesale_user.id,
+            'data_is_wholesale_sale': True,
+            'order_line': [(0, 0, {
+                'product_id': cls.product.id,
+                'product_uom_qty': 1.0,
+                'price_unit': 100.0,
+            })],
+        }, **vals) for _i in range(count)])
+
+    def _require_order_fields(self, *field_names):
+        """Omite la prueba si ``sale.order`` no tiene los campos: ``yuju_carrier_tracking_ref``,
+        ``carrier_selection_relational`` y ``wms_status`` vienen de módulos fuera de ``depends``."""
+        missing = [name for name in field_names if name not in self.env['sale.order']._fields]
+        if missing:
+            self.skipTest("sale.order no tiene los campos %s" % ', '.join(missing))
+
+    @classmethod
+    def _run_wholesale_jobs(cls):
+        """Vacía la cola de trabajos diferidos, como lo haría el cron."""
+        return cls.env['wholesale.job']._cron_run_jobs(batch_size=1000)
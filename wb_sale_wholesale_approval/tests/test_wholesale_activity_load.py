@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import tagged
+
+from .common import WholesaleCommon
+
+
+@tagged('post_install', '-at_install')
+class TestWholesaleActivityLoad(WholesaleCommon):
+    """Carga de actividades por usuario para repartir asignaciones."""
+
+    def test_load_follows_activities(self):
+        finance_user = self.finance_users[0]
+        load_before = finance_user.data_wholesale_activity_load
+        orders = self._create_wholesale_orders(3)
+        activities = orders._wholesale_schedule_activity(
+            'wb_sale_wholesale_approval.group_finance_user', 'finance_review',
+            'Revisión', '', orders[0].date_order)
+        activities.user_id = finance_user
+        finance_user.invalidate_recordset(['data_wholesale_activity_load'])
+        self.assertEqual(finance_user.data_wholesale_activity_load, load_before + 3)
+
+        activities[0].unlink()
+        self.env['wholesale.activity.load']._cron_compact()
+        finance_user.invalidate_recordset(['data_wholesale_activity_load'])
+        self.assertEqual(finance_user.data_wholesale_activity_load, load_before + 2)
+
+        # La siguiente asignación va al otro miembro de Finanzas, con menos carga
+        assignees = self.env['res.users']._wholesale_pick_assignees(
+            'wb_sale_wholesale_approval.group_finance_user', 1)
+        self.assertNotEqual(assignees, [finance_user.id])
+
+    def test_pick_assignees_with_stale_cache(self):
+        group_xmlid = 'wb_sale_wholesale_approval.group_sales_commercial_user'
+        user_ids = self.env['wholesale.registry']._get_group_user_ids(group_xmlid)
+        self.assertTrue(user_ids)
+        # Usuarios archivados sin pasar por el ORM: la caché conserva sus ids
+        self.env.flush_all()
+        self.env.cr.execute("UPDATE res_users SET active = false WHERE id IN %s", [user_ids])
+        assignees = self.env['res.users']._wholesale_pick_assignees(group_xmlid, 2)
+        self.assertEqual(assignees, [self.env.uid] * 2)
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from odoo.exceptions import UserError
+from odoo.tests import tagged
+
+from .common import WholesaleCommon
+
+
+@tagged('post_install', '-at_install')
+class TestWholesaleAutoCancel(WholesaleCommon):
+    """Cron de cancelación automática con marca de agua."""
+
+    def _confirm_aged_orders(self, count):
+        """Confirma órdenes con fechas de confirmación distintas y ya vencidas, en orden."""
+        orders = self._create_wholesale_orders(count)
+        orders.action_confirm()
+        self.env.flush_all()
+        base = datetime.now() - timedelta(days=30)
+        for index, order in enumerate(orders):
+            self.env.cr.execute(
+                "UPDATE sale_order SET data_confirmation_date = %s WHERE id = %s",
+                [base + timedelta(minutes=index), order.id])
+        self.env.invalidate_all()
+        return orders
+
+    def test_watermark_advances(self):
+        orders = self._confirm_aged_orders(3)
+        SaleOrder = self.env['sale.order']
+
+        stats = SaleOrder._cron_auto_cancel_old_orders(batch_size=2)
+        self.assertEqual(stats['processed'], 3)
+        self.assertEqual(set(orders.mapped('state')), {'cancel'})
+        self.assertEqual(SaleOrder._wholesale_get_auto_cancel_watermark()[1], orders[-1].id)
+
+        # Una orden que cruza el plazo después de la marca se cancela en la siguiente ejecución
+        late = self._confirm_aged_orders(1)
+        self.env.cr.execute(
+            "UPDATE sale_order SET data_confirmation_date = %s WHERE id = %s",
+            [datetime.now() - timedelta(days=7), late.id])
+        self.env.invalidate_all()
+        stats = SaleOrder._cron_auto_cancel_old_orders()
+        self.assertEqual(stats['processed'], 1)
+        self.assertEqual(late.state, 'cancel')
+
+    def test_failed_order_is_left_to_full_sweep(self):
+        first, failing, last = self._confirm_aged_orders(3)
+        SaleOrder = self.env['sale.order']
+        action_cancel = type(SaleOrder)._action_cancel
+
+        def _action_cancel(records):
+            if failing in records:
+                raise UserError('falla')
+            return action_cancel(records)
+
+        with patch.object(type(SaleOrder), '_action_cancel', _action_cancel):
+            stats = SaleOrder._cron_auto_cancel_old_orders()
+        self.assertEqual((stats['processed'], stats['failed']), (2, 1))
+        self.assertEqual((first.state, failing.state, last.state), ('cancel', 'sale', 'cancel'))
+        # Una orden con error no detiene la marca de agua
+        self.assertEqual(SaleOrder._wholesale_get_auto_cancel_watermark()[1], last.id)
+        self.assertEqual(SaleOrder._cron_auto_cancel_old_orders()['processed'], 0)
+
+        # La revisión completa la reintenta
+        stats = SaleOrder._cron_auto_cancel_old_orders(full_sweep=True)
+        self.assertEqual(stats['processed'], 1)
+        self.assertEqual(failing.state, 'cancel')
+
+    def test_locked_order_holds_watermark(self):
+        first, locked, last = self._confirm_aged_orders(3)
+        SaleOrder = self.env['sale.order']
+        lock = type(SaleOrder)._wholesale_lock_skip_locked
+
+        def _wholesale_lock_skip_locked(records):
+            # Simula que otra transacción tiene bloqueada la orden
+            return lock(records) - {locked.id}
+
+        with patch.object(type(SaleOrder), '_wholesale_lock_skip_locked', _wholesale_lock_skip_locked):
+            stats = SaleOrder._cron_auto_cancel_old_orders()
+        self.assertEqual((stats['processed'], stats['skipped']), (2, 1))
+        self.assertEqual(locked.state, 'sale')
+        # La marca se queda antes de la orden bloqueada y la siguiente ejecución la cancela
+        self.assertEqual(SaleOrder._wholesale_get_auto_cancel_watermark()[1], first.id)
+        stats = SaleOrder._cron_auto_cancel_old_orders()
+        self.assertEqual(stats['processed'], 1)
+        self.assertEqual(locked.state, 'cancel')
+
+    def test_full_sweep_resumes(self):
+        orders = self._confirm_aged_orders(2)
+        SaleOrder = self.env['sale.order']
+
+        with patch.object(type(self.env['ir.cron']), '_trigger') as trigger:
+            stats = SaleOrder._cron_auto_cancel_old_orders(batch_size=1, time_budget=0, full_sweep=True)
+        self.assertEqual(stats['processed'], 1)
+        trigger.assert_called_once()
+        # La revisión completa no usa ni mueve la marca
+        self.assertEqual(SaleOrder._wholesale_get_auto_cancel_watermark(), (False, 0))
+
+        stats = SaleOrder._cron_auto_cancel_old_orders(full_sweep=True)
+        self.assertEqual(stats['processed'], 1)
+        self.assertEqual(set(orders.mapped('state')), {'cancel'})
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+import base64
+
+from odoo.tests import tagged
+
+from .common import WholesaleCommon
+from ..wizard.wholesale_bank_statement_import import _to_cents
+
+
+@tagged('post_install', '-at_install')
+class TestWholesaleBankStatement(WholesaleCommon):
+    """Conciliación de estados de cuenta con órdenes al mayoreo pendientes."""
+
+    def _import(self, content, filename, **vals):
+        wizard = self.env['wholesale.bank.statement.import'].create(dict({
+            'data_file': base64.b64encode(content.encode()),
+            'filename': filename,
+        }, **vals))
+        wizard.action_import()
+        return wizard
+
+    def test_to_cents(self):
+        self.assertEqual(_to_cents('1,234.50'), 123450)
+        self.assertEqual(_to_cents('$ 1234,5'), 123450)
+        self.assertEqual(_to_cents(116.0), 11600)
+        self.assertIsNone(_to_cents('n/a'))
+
+    def test_csv_matches_by_reference_and_amount(self):
+        orders = self._create_wholesale_orders(3)
+        orders.action_confirm()
+        by_ref, unique_amount, untouched = orders
+        unique_amount.order_line.price_unit = 250.0
+        amount = '%.2f' % by_ref.data_debit_amount
+        csv_content = (
+            'Fecha,Concepto,Importe\n'
+            '2026-10-01,DEPOSITO %s,%s\n'
+            '2026-10-01,TRANSFERENCIA SIN REFERENCIA,%.2f\n'
+            '2026-10-01,COMISION,-15.00\n'
+            '2026-10-01,DEPOSITO DESCONOCIDO,9999.99\n'
+        ) % (by_ref.name, amount, unique_amount.data_debit_amount)
+
+        wizard = self._import(csv_content, 'estado.csv')
+
+        self.assertEqual(wizard.line_count, 3)
+        self.assertEqual(wizard.matched_order_ids, by_ref | unique_amount)
+        self.assertEqual(wizard.unmatched_count, 1)
+        self.assertEqual(by_ref.data_finance_approval_status, 'validation')
+        self.assertEqual(unique_amount.data_finance_approval_status, 'validation')
+        self.assertEqual(untouched.data_finance_approval_status, 'pending')
+
+    def test_ofx_ambiguous_amount_is_not_applied(self):
+        orders = self._create_wholesale_orders(2)
+        orders.action_confirm()
+        ofx_content = (
+            '<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>\n'
+            '<STMTTRN>\n<TRNTYPE>CREDIT\n<TRNAMT>%.2f\n<NAME>DEPOSITO\n</STMTTRN>\n'
+            '</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n'
+        ) % orders[0].data_debit_amount
+
+        wizard = self._import(ofx_content, 'estado.ofx')
+
+        self.assertEqual(wizard.file_type, 'ofx')
+        self.assertEqual(wizard.ambiguous_count, 1)
+        self.assertFalse(wizard.matched_order_ids)
+        self.assertEqual(set(orders.mapped('data_finance_approval_status')), {'pending'})
+
+    def test_auto_collect_requires_reference_or_vat(self):
+        self._require_order_fields('carrier_selection_relational', 'yuju_carrier_tracking_ref')
+        orders = self._create_wholesale_orders(2)
+        orders.action_confirm()
+        by_ref, amount_only = orders
+        amount_only.order_line.price_unit = 250.0
+        csv_content = (
+            'Fecha,Concepto,Importe\n'
+            '2026-10-01,DEPOSITO %s,%.2f\n'
+            '2026-10-01,TRANSFERENCIA SIN REFERENCIA,%.2f\n'
+        ) % (by_ref.name, by_ref.data_debit_amount, amount_only.data_debit_amount)
+
+        wizard = self.env['wholesale.bank.statement.import'].with_user(self.finance_users[0]).create({
+            'data_file': base64.b64encode(csv_content.encode()),
+            'filename': 'estado.csv',
+            'auto_collect': True,
+        })
+        wizard.action_import()
+
+        self.assertEqual(wizard.matched_order_ids, orders)
+        self.assertEqual(by_ref.data_finance_approval_status, 'collected')
+        # Conciliada solo por importe: pasa a validación pero no se marca como cobrada
+        self.assertEqual(amount_only.data_finance_approval_status, 'validation')
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime, timedelta
+
+from odoo.tests import tagged
+
+from .common import WholesaleCommon
+
+
+@tagged('post_install', '-at_install')
+class TestWholesaleCleanup(WholesaleCommon):
+    """Depuración del historial de órdenes al mayoreo terminadas."""
+
+    def _automated_messages(self, orders):
+        return self.env['mail.message'].search([
+            ('model', '=', 'sale.order'), ('res_id', 'in', orders.ids), ('data_wholesale_automated', '=', True)])
+
+    def test_cleanup_finished_orders(self):
+        self._require_order_fields('wms_status')
+        orders = self._create_wholesale_orders(3)
+        orders.action_confirm()
+        self._run_wholesale_jobs()
+        finished, recent, open_order = orders
+        (finished | recent).action_set_to_receipt_received()
+        (finished | recent).action_set_to_rejected()
+        self.assertTrue(self._automated_messages(finished))
+
+        manual_activity = self.env['mail.activity'].create({
+            'res_model_id': self.env['ir.model']._get_id('sale.order'),
+            'res_id': finished.id,
+            'summary': 'Llamar al cliente',
+            'user_id': self.wholesale_user.id,
+        })
+
+        self.env.flush_all()
+        self.env.cr.execute(
+            "UPDATE sale_order SET data_finance_status_date = %s WHERE id IN %s",
+            [datetime.now() - timedelta(days=400), tuple((finished | open_order).ids)])
+        self.env.invalidate_all()
+
+        stats = self.env['sale.order']._cron_cleanup_finished_orders(batch_size=1)
+
+        self.assertEqual(stats['orders'], 1)
+        self.assertTrue(finished.data_wholesale_archived)
+        self.assertIn('Pago rechazado', finished.data_wholesale_archive_summary)
+        self.assertFalse(self._automated_messages(finished))
+        # Las actividades agendadas a mano no son parte del flujo y se conservan
+        self.assertTrue(manual_activity.exists())
+        # Órdenes dentro del periodo de retención o todavía abiertas no se tocan
+        self.assertFalse(recent.data_wholesale_archived)
+        self.assertTrue(self._automated_messages(recent))
+        self.assertFalse(open_order.data_wholesale_archived)
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+from unittest.mock import patch
+
+from odoo.tests import tagged
+
+from .common import WholesaleCommon
+from ..models import res_partner
+
+
+@tagged('post_install', '-at_install')
+class TestWholesaleCredit(WholesaleCommon):
+    """Crédito disponible de los clientes al mayoreo."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.credit_partner = cls.env['res.partner'].create({
+            'name': 'Cliente Crédito',
+            'data_credit_approved': True,
+            'data_credit_limit_raw': 1000.0,
+        })
+
+    def test_available_credit_follows_orders(self):
+        Partner = self.env['res.partner']
+        self.assertEqual(Partner.wholesale_available_credit(self.credit_partner.ids)[self.credit_partner.id]['available'],
+                         1000.0)
+
+        order = self._create_wholesale_orders(
+            1, partner_id=self.credit_partner.id, data_is_credit_sale=True, data_credit_amount=60.0)
+        order.action_confirm()
+        credit = Partner.wholesale_available_credit(self.credit_partner.ids)[self.credit_partner.id]
+        self.assertEqual(credit['exposure'], 60.0)
+        self.assertEqual(credit['available'], 940.0)
+        # La propia orden puede seguir usando el crédito que ya compromete
+        self.assertEqual(order.data_partner_credit_available, 1000.0)
+
+        order.action_cancel()
+        self.assertEqual(Partner.wholesale_available_credit(self.credit_partner.ids)[self.credit_partner.id]['available'],
+                         1000.0)
+
+    def test_partner_change_moves_exposure(self):
+        other_partner = self.credit_partner.copy({'name': 'Otro Cliente Crédito'})
+        order = self._create_wholesale_orders(
+            1, partner_id=self.credit_partner.id, data_is_credit_sale=True, data_credit_amount=60.0)
+        order.action_confirm()
+        self.assertEqual(self.credit_partner.data_credit_exposure, 60.0)
+
+        order.partner_id = other_partner
+        self.assertEqual(self.credit_partner.data_credit_exposure, 0.0)
+        self.assertEqual(other_partner.data_credit_exposure, 60.0)
+
+    def test_line_edit_resyncs_exposure(self):
+        order = self._create_wholesale_orders(
+            1, partner_id=self.credit_partner.id, data_is_credit_sale=True, data_credit_amount=60.0)
+        order.action_confirm()
+        # Al bajar el total por debajo del crédito, el crédito comprometido baja con él
+        order.order_line.write({'price_unit': 10.0})
+        self.assertEqual(self.credit_partner.data_credit_exposure, order.data_total_order_amount)
+        self.assertLess(self.credit_partner.data_credit_exposure, 60.0)
+
+    def test_limit_change_invalidates_cache(self):
+        Partner = self.env['res.partner']
+        Partner.wholesale_available_credit(self.credit_partner.ids)
+        self.credit_partner.data_credit_limit_raw = 250.0
+        self.assertEqual(Partner.wholesale_available_credit(self.credit_partner.ids)[self.credit_partner.id]['limit'],
+                         250.0)
+
+    def test_foreign_currency_exposure_is_converted(self):
+        company = self.env.company
+        foreign = self.env.ref('base.EUR') if company.currency_id != self.env.ref('base.EUR') \
+            else self.env.ref('base.USD')
+        foreign.active = True
+        self.env['res.currency.rate'].create({
+            'currency_id': foreign.id,
+            'company_id': company.id,
+            'name': '2000-01-01',
+            'rate': 0.5,
+        })
+        pricelist = self.env['product.pricelist'].create({'name': 'Mayoreo extranjera', 'currency_id': foreign.id})
+
+        order = self._create_wholesale_orders(
+            1, partner_id=self.credit_partner.id, pricelist_id=pricelist.id,
+            data_is_credit_sale=True, data_credit_amount=50.0)
+        self.assertEqual(order.currency_id, foreign)
+        self.assertEqual(order.data_partner_credit_limit_amount, 500.0)
+
+        order.action_confirm()
+        # 50 en la moneda de la orden equivalen a 100 en la moneda del crédito del cliente
+        self.assertEqual(self.credit_partner.data_credit_exposure, 100.0)
+        self.assertEqual(order.data_credit_exposure_amount, 100.0)
+
+        order.action_cancel()
+        self.assertEqual(self.credit_partner.data_credit_exposure, 0.0)
+
+    def test_credit_cache_is_bounded(self):
+        partners = self.partner | self.credit_partner
+        with patch.object(res_partner, 'CREDIT_CACHE_SIZE', 1):
+            partners._wholesale_available_credit()
+            self.assertLessEqual(len(res_partner._credit_cache), 1)
+        # Las entradas vencidas se descartan en la siguiente escritura
+        with patch.object(res_partner, 'CREDIT_CACHE_TTL', -1):
+            partners._wholesale_available_credit()
+            self.assertFalse(res_partner._credit_cache)
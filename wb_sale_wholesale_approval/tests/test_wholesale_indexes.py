@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime, timedelta
+
+from odoo.tests import tagged
+
+from .common import WholesaleCommon
+
+
+@tagged('post_install', '-at_install')
+class TestWholesaleIndexes(WholesaleCommon):
+    """El planificador debe usar los índices parciales creados por el módulo."""
+
+    def _explain(self, model, domain):
+        self.env.cr.execute("SET enable_seqscan = off")
+        self.addCleanup(self.env.cr.execute, "RESET enable_seqscan")
+        self.env[model].flush_model()
+        query = self.env[model]._where_calc(domain)
+        sql, params = query.select('"%s".id' % self.env[model]._table)
+        self.env.cr.execute('EXPLAIN ' + sql, params)
+        return '\n'.join(row[0] for row in self.env.cr.fetchall())
+
+    def test_auto_cancel_domain_uses_partial_index(self):
+        limit_date = datetime.now() - timedelta(hours=144)
+        plan = self._explain('sale.order', [
+            ('data_is_wholesale_sale', '=', True),
+            ('data_finance_approval_status', '=', 'pending'),
+            ('state', 'in', ['sale', 'done']),
+            ('data_confirmation_date', '<', limit_date),
+        ])
+        self.assertIn('sale_order_wholesale_pending_confirmation_id_idx', plan)
+
+    def test_finance_status_domain_uses_partial_index(self):
+        plan = self._explain('sale.order', [
+            ('data_is_wholesale_sale', '=', True),
+            ('data_finance_approval_status', '=', 'validation'),
+        ])
+        self.assertIn('sale_order_wholesale_finance_status_idx', plan)
+
+    def test_activity_stage_lookup_uses_index(self):
+        orders = self._create_wholesale_orders(2)
+        plan = self._explain('mail.activity', [
+            ('res_model_id', '=', self.env['ir.model']._get_id('sale.order')),
+            ('res_id', 'in', orders.ids),
+            ('data_wholesale_stage', '=', 'finance_review'),
+        ])
+        self.assertIn('mail_activity_wholesale_stage_idx', plan)
+
+    def test_module_indexes_exist(self):
+        self.env.cr.execute("""
+            SELECT indexname FROM pg_indexes
+             WHERE tablename IN ('sale_order', 'mail_activity')
+               AND indexname IN %s
+        """, [('sale_order_wholesale_pending_confirmation_id_idx',
+               'sale_order_wholesale_finance_status_idx',
+               'mail_activity_wholesale_stage_idx')])
+        self.assertEqual(len(self.env.cr.fetchall()), 3)
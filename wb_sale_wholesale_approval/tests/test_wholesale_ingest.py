@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+from odoo.exceptions import UserError
+from odoo.tests import tagged
+
+from .common import WholesaleCommon
+
+
+@tagged('post_install', '-at_install')
+class TestWholesaleIngest(WholesaleCommon):
+    """Ingesta de órdenes al mayoreo por lotes."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.product.default_code = 'MAY-001'
+        cls.partner.ref = 'CLI-001'
+
+    def _batch(self, count, **extra):
+        return [dict({
+            'partner_ref': 'CLI-001',
+            'client_order_ref': 'PORTAL-%04d' % i,
+            'lines': [{'default_code': 'MAY-001', 'quantity': 3, 'price_unit': 90.0}],
+        }, **extra) for i in range(count)]
+
+    def test_ingest_creates_and_confirms(self):
+        result = self.env['sale.order'].with_user(self.wholesale_user)._wholesale_ingest_batch(
+            self._batch(20), confirm=True)
+        orders = self.env['sale.order'].browse(result['order_ids'])
+        self.assertEqual(len(orders), 20)
+        self.assertEqual(set(orders.mapped('team_id').ids), {self.wholesale_team.id})
+        self.assertEqual(set(orders.mapped('state')), {'sale'})
+        self.assertEqual(set(orders.mapped('data_finance_approval_status')), {'pending'})
+        self.assertEqual(orders[0].order_line.product_uom_qty, 3)
+
+    def test_ingest_is_idempotent_by_client_ref(self):
+        first = self.env['sale.order']._wholesale_ingest_batch(self._batch(5))
+        second = self.env['sale.order']._wholesale_ingest_batch(self._batch(6))
+        self.assertEqual(len(second['order_ids']), 1)
+        self.assertEqual(sorted(second['existing_ids']), sorted(first['order_ids']))
+
+    def test_ingest_validates_whole_batch(self):
+        batch = self._batch(3)
+        batch[1]['partner_ref'] = 'NO-EXISTE'
+        batch[2]['lines'][0]['default_code'] = 'NO-EXISTE'
+        count = self.env['sale.order'].search_count([])
+        with self.assertRaises(UserError) as error:
+            self.env['sale.order']._wholesale_ingest_batch(batch)
+        self.assertIn('Orden 2', str(error.exception))
+        self.assertIn('Orden 3, línea 1', str(error.exception))
+        self.assertEqual(self.env['sale.order'].search_count([]), count)
+
+    def test_ingest_rejects_wrong_types(self):
+        batch = self._batch(5)
+        batch[0] = 'no es un objeto'
+        batch[1]['partner_id'] = '12'
+        batch[2]['client_order_ref'] = ['PORTAL']
+        batch[3]['lines'][0]['quantity'] = '3'
+        batch[4]['lines'] = {'default_code': 'MAY-001'}
+        with self.assertRaises(UserError) as error:
+            self.env['sale.order']._wholesale_ingest_batch(batch)
+        message = str(error.exception)
+        self.assertIn('Orden 1: debe ser un objeto', message)
+        self.assertIn('Orden 2: el campo partner_id', message)
+        self.assertIn('Orden 3: el campo client_order_ref', message)
+        self.assertIn('Orden 4, línea 1: el campo quantity', message)
+        self.assertIn('Orden 5: el campo lines', message)
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+from unittest.mock import patch
+
+from odoo.tests import tagged
+
+from .common import WholesaleCommon
+
+
+@tagged('post_install', '-at_install')
+class TestWholesaleJob(WholesaleCommon):
+    """Cola de trabajos diferidos de la confirmación al mayoreo."""
+
+    def _order_activities(self, orders):
+        return self.env['mail.activity'].search([
+            ('res_model', '=', 'sale.order'),
+            ('res_id', 'in', orders.ids),
+            ('data_wholesale_stage', '!=', False),
+        ])
+
+    def test_confirm_enqueues_side_effects(self):
+        orders = self._create_wholesale_orders(3)
+        orders.action_confirm()
+
+        self.assertEqual(set(orders.mapped('data_finance_approval_status')), {'pending'})
+        self.assertFalse(self._order_activities(orders))
+        jobs = self.env['wholesale.job'].search([('res_model', '=', 'sale.order'), ('res_id', 'in', orders.ids)])
+        self.assertEqual(len(jobs), 3)
+
+        self._run_wholesale_jobs()
+        self.assertEqual(set(jobs.mapped('state')), {'done'})
+        self.assertEqual(len(self._order_activities(orders)), 3)
+        self.assertIn(self.commercial_user.partner_id, orders[0].message_partner_ids)
+
+    def test_job_is_idempotent(self):
+        orders = self._create_wholesale_orders(2)
+        orders.action_confirm()
+        self._run_wholesale_jobs()
+
+        # Volver a ejecutar el trabajo no duplica actividades
+        orders._wholesale_job_after_confirm()
+        self.assertEqual(len(self._order_activities(orders)), 2)
+
+        # Volver a encolar con la misma llave no crea otro trabajo
+        jobs = self.env['wholesale.job']._enqueue(
+            orders, '_wholesale_job_after_confirm',
+            lambda order: self.env['wholesale.job'].search([('res_id', '=', order.id)], limit=1).name,
+        )
+        self.assertFalse(jobs)
+
+    def test_failed_job_is_retried(self):
+        orders = self._create_wholesale_orders(1)
+        orders.action_confirm()
+        job = self.env['wholesale.job'].search([('res_id', '=', orders.id)])
+
+        with patch.object(type(orders), '_wholesale_job_after_confirm', side_effect=ValueError('falla')):
+            self._run_wholesale_jobs()
+        self.assertEqual(job.state, 'pending')
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('falla', job.last_error)
+
+        # El reintento queda programado a futuro; se adelanta para la prueba
+        job.eta = '2000-01-01 00:00:00'
+        self._run_wholesale_jobs()
+        self.assertEqual(job.state, 'done')
+        self.assertEqual(len(self._order_activities(orders)), 1)
+
+    def test_job_subscribes_moved_on_orders(self):
+        orders = self._create_wholesale_orders(2)
+        orders.action_confirm()
+        # La orden se cancela antes de que corra el trabajo: no lleva actividad, pero sí seguidores
+        orders[0]._action_cancel()
+        self._run_wholesale_jobs()
+        self.assertFalse(self._order_activities(orders[0]))
+        for order in orders:
+            self.assertIn(self.commercial_user.partner_id, order.message_partner_ids)
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+from datetime import date, timedelta
+
+from odoo.tests import tagged
+
+from .common import WholesaleCommon
+
+
+@tagged('post_install', '-at_install')
+class TestWholesaleNotification(WholesaleCommon):
+    """Modos de notificación a los grupos de mayoreo."""
+
+    def setUp(self):
+        super().setUp()
+        self.channel = self.env.ref('wb_sale_wholesale_approval.channel_wholesale_orders')
+
+    def test_followers_mode_subscribes_groups(self):
+        orders = self._create_wholesale_orders(2)
+        orders.action_confirm()
+        self._run_wholesale_jobs()
+        for order in orders:
+            self.assertIn(self.commercial_user.partner_id, order.message_partner_ids)
+            self.assertIn(self.finance_users[0].partner_id, order.message_partner_ids)
+
+    def test_channel_mode_posts_to_channel(self):
+        self.env['ir.config_parameter'].sudo().set_param(
+            'wb_sale_wholesale_approval.notification_mode', 'channel')
+        messages_before = len(self.channel.message_ids)
+
+        orders = self._create_wholesale_orders(3)
+        orders.action_confirm()
+        self._run_wholesale_jobs()
+
+        for order in orders:
+            self.assertNotIn(self.commercial_user.partner_id, order.message_partner_ids)
+            self.assertNotIn(self.finance_users[0].partner_id, order.message_partner_ids)
+        # Un solo mensaje en el canal por lote de cambios de estado
+        self.assertEqual(len(self.channel.message_ids), messages_before + 1)
+        self.assertIn(orders[0].name, self.channel.message_ids[0].body)
+
+    def test_channel_mode_mirrors_automated_posts(self):
+        self._require_order_fields('wms_status')
+        self.env['ir.config_parameter'].sudo().set_param(
+            'wb_sale_wholesale_approval.notification_mode', 'channel')
+        orders = self._create_wholesale_orders(2)
+        orders.action_confirm()
+        self._run_wholesale_jobs()
+        orders.action_set_to_receipt_received()
+        messages_before = self.channel.message_ids
+
+        orders.action_set_to_rejected()
+
+        # El aviso de cancelación llega al canal en un solo mensaje para el lote
+        new_messages = self.channel.message_ids - messages_before
+        mirrored = new_messages.filtered(lambda m: 'rechazo del pago' in m.body)
+        self.assertEqual(len(mirrored), 1)
+        for order in orders:
+            self.assertIn(order.name, mirrored.body)
+
+    def test_payment_reminder_digest(self):
+        self.env['ir.config_parameter'].sudo().set_param(
+            'wb_sale_wholesale_approval.payment_reminder_mode', 'digest')
+        orders = self._create_wholesale_orders(4)
+        orders.action_confirm()
+        self._run_wholesale_jobs()
+        self.env['mail.activity'].search([
+            ('res_model', '=', 'sale.order'), ('res_id', 'in', orders.ids),
+        ]).date_deadline = date.today() - timedelta(days=5)
+
+        Message = self.env['mail.message']
+        comments_before = Message.search_count([
+            ('model', '=', 'sale.order'), ('res_id', 'in', orders.ids), ('message_type', '=', 'comment')])
+        digests_before = Message.search_count([('partner_ids', 'in', self.wholesale_user.partner_id.ids)])
+
+        self.env['sale.order']._cron_send_payment_reminder_message()
+
+        # Un solo resumen para el vendedor y ningún comentario nuevo en las órdenes
+        self.assertEqual(Message.search_count([('partner_ids', 'in', self.wholesale_user.partner_id.ids)]),
+                         digests_before + 1)
+        self.assertEqual(Message.search_count([
+            ('model', '=', 'sale.order'), ('res_id', 'in', orders.ids), ('message_type', '=', 'comment')]),
+            comments_before)
+        reminders = self.env['wholesale.payment.reminder'].search([('order_id', 'in', orders.ids)])
+        self.assertEqual(reminders.order_id, orders)
+
+        # La bitácora evita un segundo resumen el mismo día
+        self.env['sale.order']._cron_send_payment_reminder_message()
+        self.assertEqual(Message.search_count([('partner_ids', 'in', self.wholesale_user.partner_id.ids)]),
+                         digests_before + 1)
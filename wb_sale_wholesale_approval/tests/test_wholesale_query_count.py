@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+import logging
+import time
+from datetime import datetime, timedelta
+
+from odoo.tests import tagged
+
+from .common import WholesaleCommon
+
+_logger = logging.getLogger(__name__)
+
+# Tamaños de lote que se comparan contra el lote de una orden
+BATCH_SIZES = (10, 500)
+
+# Consultas adicionales toleradas entre el lote de una orden y los lotes mayores
+# (ruido de prefetch y de caché que no depende del número de órdenes)
+QUERY_SLACK = 5
+
+# Consultas por orden adicional que cada punto de entrada puede agregar sobre su lote de una
+# orden. Los caminos en lote del módulo (confirmación, guía, transiciones, selección de los
+# crons) deben ser constantes: 0. Solo se tolera costo por orden donde el trabajo en el
+# chatter es por registro por diseño: el mensaje de cada rechazo, el savepoint y el mensaje
+# de cada cancelación automática y el aviso en cada orden.
+PER_RECORD_QUERIES = {
+    'action_confirm': 0,
+    'job_after_confirm': 0,
+    'write_carrier_tracking': 0,
+    'action_cancel': 0,
+    'action_set_to_receipt_received': 0,
+    'action_set_to_collected': 0,
+    'action_set_to_rejected': 8,
+    'cron_auto_cancel': 12,
+    'cron_payment_reminder': 8,
+}
+
+
+@tagged('post_install', '-at_install', 'wholesale_perf')
+class TestWholesaleQueryCount(WholesaleCommon):
+    """Las consultas SQL de cada punto de entrada no deben crecer con el número de órdenes.
+
+    Se mide el lote de una orden y se exige con ``assertQueryCount`` que los lotes de
+    10 y 500 órdenes no lo superen en más de ``PER_RECORD_QUERIES`` por orden
+    adicional; el tiempo de cada lote queda en el registro. Donde sale.order ya
+    hace trabajo por orden (suscripción del cliente al confirmar, cancelación) se resta
+    la misma medición sobre órdenes que no son de mayoreo, para contar solo lo que
+    agrega el módulo. El seguimiento de cambios, que es del núcleo, se desactiva.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.env = cls.env(context=dict(cls.env.context, tracking_disable=True))
+
+    def _count_queries(self, prepare, run, count):
+        orders = prepare(count)
+        self.env.flush_all()
+        self.env.invalidate_all()
+        start = self.cr.sql_log_count
+        run(orders)
+        self.env.flush_all()
+        return self.cr.sql_log_count - start
+
+    def _benchmark(self, name, prepare, run, reference=None):
+        """Mide ``run(orders)`` sobre lotes de 1, 10 y 500 órdenes creadas con ``prepare(count)``.
+
+        El lote de una orden se mide en la misma corrida y es la constante del límite;
+        cada lote mayor se ejecuta dentro de ``assertQueryCount`` con esa constante más
+        ``PER_RECORD_QUERIES`` por orden adicional, y se registra su tiempo. Si se da
+        ``reference`` (mismo ``prepare`` para órdenes que no son de mayoreo), el límite
+        incluye lo que el núcleo hace con el mismo lote.
+        """
+        def core_queries(count):
+            return self._count_queries(reference, run, count) if reference else 0
+
+        # Calentar cachés (ormcache, registro de mayoreo) para que no cuenten en la medición
+        self._count_queries(prepare, run, 1)
+        single = self._count_queries(prepare, run, 1) - core_queries(1)
+        per_record = PER_RECORD_QUERIES[name]
+        _logger.info("%s con 1 orden: %d consultas propias del módulo", name, single)
+        for count in BATCH_SIZES:
+            with self.subTest(entry_point=name, orders=count):
+                core = core_queries(count)
+                orders = prepare(count)
+                self.env.flush_all()
+                self.env.invalidate_all()
+                queries_before = self.cr.sql_log_count
+                start = time.perf_counter()
+                with self.assertQueryCount(core + single + per_record * (count - 1) + QUERY_SLACK):
+                    run(orders)
+                elapsed = time.perf_counter() - start
+                extra = self.cr.sql_log_count - queries_before - core - single
+                _logger.info(
+                    "%s con %d órdenes: %.3f s, %.2f consultas por orden adicional (límite %d)",
+                    name, count, elapsed, extra / (count - 1), per_record)
+
+    def _plain_orders(self, count):
+        return self._create_wholesale_orders(count, data_is_wholesale_sale=False)
+
+    def _plain_confirmed_orders(self, count):
+        orders = self._plain_orders(count)
+        orders.action_confirm()
+        return orders
+
+    def _draft_orders(self, count):
+        return self._create_wholesale_orders(count)
+
+    def _confirmed_orders(self, count):
+        orders = self._create_wholesale_orders(count)
+        orders.action_confirm()
+        self._run_wholesale_jobs()
+        return orders
+
+    def _validation_orders(self, count):
+        orders = self._confirmed_orders(count)
+        orders.action_set_to_receipt_received()
+        return orders
+
+    def _age_orders(self, orders, hours):
+        """Mueve la confirmación y el vencimiento de las actividades al pasado."""
+        self.env.flush_all()
+        past = datetime.now() - timedelta(hours=hours)
+        self.env.cr.execute(
+            "UPDATE sale_order SET data_confirmation_date = %s WHERE id IN %s", [past, tuple(orders.ids)])
+        self.env.cr.execute(
+            "UPDATE mail_activity SET date_deadline = %s WHERE res_model = 'sale.order' AND res_id IN %s",
+            [past.date(), tuple(orders.ids)])
+        self.env.invalidate_all()
+        return orders
+
+    def test_action_confirm(self):
+        self._benchmark('action_confirm', self._draft_orders, lambda orders: orders.action_confirm(),
+                        reference=self._plain_orders)
+
+    def test_job_after_confirm(self):
+        def prepare(count):
+            orders = self._create_wholesale_orders(count)
+            orders.action_confirm()
+            return orders
+        self._benchmark('job_after_confirm', prepare, lambda orders: self._run_wholesale_jobs())
+
+    def test_write_carrier_tracking(self):
+        self._require_order_fields('yuju_carrier_tracking_ref')
+        self._benchmark(
+            'write_carrier_tracking', self._confirmed_orders,
+            lambda orders: orders.write({'yuju_carrier_tracking_ref': 'GUIA-001'}),
+            reference=self._plain_confirmed_orders,
+        )
+
+    def test_action_cancel(self):
+        self._benchmark('action_cancel', self._confirmed_orders, lambda orders: orders.action_cancel(),
+                        reference=self._plain_confirmed_orders)
+
+    def test_action_set_to_receipt_received(self):
+        self._benchmark(
+            'action_set_to_receipt_received', self._confirmed_orders,
+            lambda orders: orders.action_set_to_receipt_received(),
+        )
+
+    def test_action_set_to_collected(self):
+        self._require_order_fields(
+            'carrier_selection_relational', 'yuju_carrier_tracking_ref', 'data_total_carrier_tracking')
+        self._benchmark(
+            'action_set_to_collected', self._validation_orders,
+            lambda orders: orders.action_set_to_collected(),
+        )
+
+    def test_action_set_to_rejected(self):
+        self._require_order_fields('wms_status')
+        self._benchmark(
+            'action_set_to_rejected', self._validation_orders,
+            lambda orders: orders.action_set_to_rejected(),
+        )
+
+    def test_cron_auto_cancel(self):
+        self._benchmark(
+            'cron_auto_cancel',
+            lambda count: self._age_orders(self._confirmed_orders(count), hours=200),
+            lambda orders: self.env['sale.order']._cron_auto_cancel_old_orders(batch_size=1000),
+        )
+
+    def test_cron_payment_reminder(self):
+        self._benchmark(
+            'cron_payment_reminder',
+            lambda count: self._age_orders(self._confirmed_orders(count), hours=100),
+            lambda orders: self.env['sale.order']._cron_send_payment_reminder_message(),
+        )
@@ -0,0 +1,2 @@
+from . import sale_order_finance_approval_wizard
+from . import wholesale_bank_statement_import
\ No newline at end of file
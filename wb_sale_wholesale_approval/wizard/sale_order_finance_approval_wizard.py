@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+
+
+class SaleOrderFinanceApprovalWizard(models.TransientModel):
+    _name = 'sale.order.finance.approval.wizard'
+    _description = 'Aprobación financiera masiva de ventas al mayoreo'
+
+    order_ids = fields.Many2many(
+        'sale.order',
+        'sale_order_finance_approval_wizard_order_rel',
+        string='Órdenes de venta',
+    )
+    target_status = fields.Selection([
+        ('validation', 'Comprobante recibido'),
+        ('collected', 'Pago cobrado'),
+        ('rejected', 'Pago rechazado'),
+    ], string='Acción', required=True, default='validation')
+
+    state = fields.Selection([
+        ('draft', 'Borrador'),
+        ('done', 'Aplicado'),
+    ], default='draft')
+    processed_count = fields.Integer(string='Órdenes actualizadas', readonly=True)
+    skipped_order_ids = fields.Many2many(
+        'sale.order',
+        'sale_order_finance_approval_wizard_skipped_rel',
+        string='Órdenes omitidas',
+        readonly=True,
+        help='Órdenes que no estaban en el estado financiero de origen requerido.',
+    )
+
+    @api.model
+    def default_get(self, fields_list):
+        res = super().default_get(fields_list)
+        if self.env.context.get('active_model') == 'sale.order' and 'order_ids' in fields_list:
+            orders = self.env['sale.order'].browse(self.env.context.get('active_ids', []))
+            res['order_ids'] = [(6, 0, orders.filtered('data_is_wholesale_sale').ids)]
+        return res
+
+    def action_apply(self):
+        self.ensure_one()
+        # Cobrar o rechazar un pago está reservado a Finanzas, igual que los botones del formulario
+        if self.target_status in ('collected', 'rejected') \
+                and not self.env.user.has_group('wb_sale_wholesale_approval.group_finance_user'):
+            raise UserError(_("Solo los usuarios de Finanzas pueden marcar pagos como cobrados o rechazados."))
+
+        transition = {
+            'validation': '_wholesale_set_to_validation',
+            'collected': '_wholesale_set_to_collected',
+            'rejected': '_wholesale_set_to_rejected',
+        }[self.target_status]
+        skipped = getattr(self.order_ids, transition)()
+
+        self.write({
+            'state': 'done',
+            'processed_count': len(self.order_ids - skipped),
+            'skipped_order_ids': [(6, 0, skipped.ids)],
+        })
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
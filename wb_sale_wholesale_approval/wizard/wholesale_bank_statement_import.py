@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+import csv
+import io
+import logging
+import re
+
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+# Encabezados reconocidos en el CSV del banco (en minúsculas, sin acentos)
+CSV_AMOUNT_HEADERS = ('amount', 'importe', 'monto', 'abono', 'deposito', 'credit')
+CSV_DESCRIPTION_HEADERS = ('description', 'descripcion', 'concepto', 'referencia', 'reference', 'memo')
+CSV_VAT_HEADERS = ('vat', 'rfc')
+
+# Renglones no conciliados que se conservan para mostrar en el asistente
+UNMATCHED_LOG_LIMIT = 100
+
+OFX_TAG_RE = re.compile(r'<(/?)([A-Z.]+)>([^<\r\n]*)', re.IGNORECASE)
+TOKEN_RE = re.compile(r'[A-Z0-9/_-]+')
+
+
+def _to_cents(value):
+    """Convierte un importe como ``'1,234.50'``, ``'$ 1234,5'`` o ``1234.5`` a centavos enteros."""
+    if isinstance(value, (int, float)):
+        return int(round(value * 100))
+    text = re.sub(r'[^0-9,.\-]', '', value or '')
+    if ',' in text and '.' in text:
+        text = text.replace(',', '')
+    elif ',' in text:
+        # Coma decimal solo si le siguen uno o dos dígitos
+        integer, __, decimals = text.rpartition(',')
+        text = '%s.%s' % (integer.replace(',', ''), decimals) if len(decimals) <= 2 else text.replace(',', '')
+    try:
+        return int(round(float(text) * 100))
+    except ValueError:
+        return None
+
+
+def _normalize_vat(vat):
+    return re.sub(r'[^A-Z0-9]', '', (vat or '').upper())
+
+
+def _strip_accents(text):
+    return text.lower().translate(str.maketrans('áéíóúü', 'aeiouu')).strip()
+
+
+class WholesaleBankStatementImport(models.TransientModel):
+    """Concilia un estado de cuenta (CSV u OFX) con las órdenes al mayoreo por cobrar.
+
+    El archivo se lee renglón por renglón desde el adjunto, sin cargarlo
+    completo en memoria. Las órdenes abiertas se indexan una sola vez en
+    diccionarios por referencia, por (importe, RFC) y por importe, así que
+    cada depósito se concilia en tiempo constante. Las órdenes conciliadas
+    avanzan con las transiciones de estado financiero existentes, en lote;
+    solo las conciliadas por referencia o RFC se pueden marcar como cobradas.
+    """
+    _name = 'wholesale.bank.statement.import'
+    _description = 'Conciliación de estado de cuenta (mayoreo)'
+
+    data_file = fields.Binary(string='Estado de cuenta', required=True, attachment=True)
+    filename = fields.Char(string='Nombre del archivo')
+    file_type = fields.Selection([
+        ('csv', 'CSV'),
+        ('ofx', 'OFX'),
+    ], string='Formato', compute='_compute_file_type', store=True, readonly=False)
+    auto_collect = fields.Boolean(
+        string='Marcar como cobradas',
+        help='Además de pasar a "En validación", marca como cobradas las órdenes conciliadas por '
+             'referencia o por RFC; las conciliadas solo por importe quedan en validación. '
+             'Solo disponible para Finanzas.',
+    )
+
+    state = fields.Selection([
+        ('draft', 'Borrador'),
+        ('done', 'Aplicado'),
+    ], default='draft')
+    line_count = fields.Integer(string='Depósitos leídos', readonly=True)
+    matched_order_ids = fields.Many2many(
+        'sale.order',
+        'wholesale_bank_statement_import_order_rel',
+        string='Órdenes conciliadas',
+        readonly=True,
+    )
+    ambiguous_count = fields.Integer(
+        string='Depósitos ambiguos', readonly=True,
+        help='Depósitos cuyo importe coincide con más de una orden, sin referencia ni RFC que los distinga.',
+    )
+    unmatched_count = fields.Integer(string='Depósitos sin conciliar', readonly=True)
+    unmatched_log = fields.Text(string='Depósitos sin conciliar (detalle)', readonly=True)
+
+    @api.depends('filename')
+    def _compute_file_type(self):
+        for wizard in self:
+            wizard.file_type = 'ofx' if (wizard.filename or '').lower().endswith(('.ofx', '.qfx')) else 'csv'
+
+    # ---------------------------------------------------------------------------------
+    # Lectura del archivo
+    def _open_stream(self):
+        """Abre el adjunto del archivo como flujo de texto, leyendo del filestore cuando es posible."""
+        attachment = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_id', '=', self.id),
+            ('res_field', '=', 'data_file'),
+        ], limit=1)
+        if not attachment:
+            raise UserError(_('Cargue el archivo del estado de cuenta.'))
+        if attachment.store_fname:
+            binary = open(attachment._full_path(attachment.store_fname), 'rb')
+        else:
+            binary = io.BytesIO(attachment.raw)
+        return io.TextIOWrapper(binary, encoding='utf-8-sig', errors='replace', newline='')
+
+    def _iter_csv(self, stream):
+        """Genera ``(centavos, descripción, rfc)`` por cada depósito del CSV."""
+        sample = stream.readline()
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t|')
+        except csv.Error:
+            dialect = csv.excel
+        header = [_strip_accents(h) for h in next(csv.reader([sample], dialect))]
+
+        def column(names):
+            return next((header.index(name) for name in names if name in header), None)
+
+        amount_col = column(CSV_AMOUNT_HEADERS)
+        description_col = column(CSV_DESCRIPTION_HEADERS)
+        vat_col = column(CSV_VAT_HEADERS)
+        if amount_col is None:
+            raise UserError(_('El CSV no tiene una columna de importe (%s).') % ', '.join(CSV_AMOUNT_HEADERS))
+
+        for row in csv.reader(stream, dialect):
+            if len(row) <= amount_col:
+                continue
+            yield (
+                _to_cents(row[amount_col]),
+                row[description_col] if description_col is not None and len(row) > description_col else '',
+                row[vat_col] if vat_col is not None and len(row) > vat_col else '',
+            )
+
+    def _iter_ofx(self, stream):
+        """Genera ``(centavos, descripción, rfc)`` por cada ``<STMTTRN>`` del OFX (SGML o XML)."""
+        transaction = None
+        for line in stream:
+            for closing, tag, value in OFX_TAG_RE.findall(line):
+                tag = tag.upper()
+                if tag == 'STMTTRN':
+                    if closing and transaction is not None:
+                        yield (
+                            _to_cents(transaction.get('TRNAMT')),
+                            ' '.join(filter(None, [transaction.get('NAME'), transaction.get('MEMO'),
+                                                   transaction.get('CHECKNUM'), transaction.get('REFNUM')])),
+                            '',
+                        )
+                        transaction = None
+                    elif not closing:
+                        transaction = {}
+                elif transaction is not None and not closing and value.strip():
+                    transaction[tag] = value.strip()
+
+    # ---------------------------------------------------------------------------------
+    # Índice de órdenes abiertas
+    def _build_index(self, statuses):
+        """Índices en memoria de las órdenes al mayoreo por cobrar, con una sola lectura."""
+        orders = self.env['sale.order'].search_read([
+            ('data_is_wholesale_sale', '=', True),
+            ('state', 'in', ['sale', 'done']),
+            ('data_finance_approval_status', 'in', statuses),
+        ], ['name', 'client_order_ref', 'data_debit_amount', 'partner_id', 'data_finance_approval_status'])
+
+        partners = self.env['res.partner'].browse({o['partner_id'][0] for o in orders if o['partner_id']})
+        vat_by_partner = {p.id: _normalize_vat(p.commercial_partner_id.vat) for p in partners}
+
+        by_ref, by_amount_vat, by_amount, amount_by_id = {}, {}, {}, {}
+        for order in orders:
+            cents = _to_cents(order['data_debit_amount'])
+            amount_by_id[order['id']] = cents
+            for ref in (order['name'], order['client_order_ref']):
+                if ref:
+                    by_ref[ref.upper()] = order['id']
+            vat = vat_by_partner.get(order['partner_id'] and order['partner_id'][0])
+            if vat:
+                by_amount_vat.setdefault((cents, vat), []).append(order['id'])
+            # El importe solo no basta para una orden ya en validación: no hay nada que avanzar
+            if order['data_finance_approval_status'] == 'pending':
+                by_amount.setdefault(cents, []).append(order['id'])
+        return by_ref, by_amount_vat, by_amount, amount_by_id
+
+    # ---------------------------------------------------------------------------------
+    def action_import(self):
+        self.ensure_one()
+        if self.auto_collect \
+                and not self.env.user.has_group('wb_sale_wholesale_approval.group_finance_user'):
+            raise UserError(_("Solo los usuarios de Finanzas pueden marcar pagos como cobrados."))
+
+        statuses = ['pending', 'validation'] if self.auto_collect else ['pending']
+        by_ref, by_amount_vat, by_amount, amount_by_id = self._build_index(statuses)
+
+        matched_ids = set()
+        # Conciliadas por referencia o RFC: las únicas que se pueden marcar como cobradas
+        confirmed_ids = set()
+        line_count = ambiguous_count = unmatched_count = 0
+        unmatched_log = []
+
+        def take(candidates):
+            """Primera orden candidata aún sin conciliar; ``None`` si ninguna o si hay más de una."""
+            free = [order_id for order_id in candidates or () if order_id not in matched_ids]
+            return free[0] if len(free) == 1 else (None if not free else False)
+
+        stream = self._open_stream()
+        try:
+            rows = self._iter_ofx(stream) if self.file_type == 'ofx' else self._iter_csv(stream)
+            for cents, description, vat in rows:
+                # Solo depósitos
+                if not cents or cents <= 0:
+                    continue
+                line_count += 1
+
+                # 1) Referencia de la orden en la descripción, con el mismo importe
+                order_id = None
+                for token in TOKEN_RE.findall((description or '').upper()):
+                    candidate = by_ref.get(token)
+                    if candidate and candidate not in matched_ids and amount_by_id[candidate] == cents:
+                        order_id = candidate
+                        break
+                # 2) Importe y RFC del cliente; 3) importe único
+                if order_id is None and vat:
+                    order_id = take(by_amount_vat.get((cents, _normalize_vat(vat))))
+                if order_id:
+                    confirmed_ids.add(order_id)
+                elif order_id is None:
+                    order_id = take(by_amount.get(cents))
+
+                if order_id:
+                    matched_ids.add(order_id)
+                    continue
+                if order_id is False:
+                    ambiguous_count += 1
+                else:
+                    unmatched_count += 1
+                if len(unmatched_log) < UNMATCHED_LOG_LIMIT:
+                    unmatched_log.append('%.2f  %s' % (cents / 100.0, (description or '').strip()[:120]))
+        finally:
+            stream.close()
+
+        # Avanzar en lote con las transiciones existentes
+        matched = self.env['sale.order'].browse(sorted(matched_ids))
+        matched._wholesale_set_to_validation()
+        if self.auto_collect:
+            matched.filtered(lambda o: o.id in confirmed_ids)._wholesale_set_to_collected()
+
+        _logger.info("Estado de cuenta de mayoreo: %d depósitos, %d conciliados, %d ambiguos, %d sin conciliar.",
+                     line_count, len(matched), ambiguous_count, unmatched_count)
+        self.write({
+            'state': 'done',
+            'line_count': line_count,
+            'matched_order_ids': [(6, 0, matched.ids)],
+            'ambiguous_count': ambiguous_count,
+            'unmatched_count': unmatched_count,
+            'unmatched_log': '\n'.join(unmatched_log),
+        })
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }